@@ -1,7 +1,7 @@
 # alembic/env.py
 from __future__ import annotations
 from logging.config import fileConfig
-import os
+import os, re
 from urllib.parse import urlsplit, urlunsplit
 
 from alembic import context
@@ -50,6 +50,13 @@ config.set_main_option("sqlalchemy.url", db_url)
 from app.models import Base  # noqa: E402
 target_metadata = Base.metadata
 
+# Daily partitions of `checks` are created/dropped at runtime (app/services/partitions.py),
+# so keep autogenerate from trying to drop them.
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not re.fullmatch(r"checks_(p\d{8}|default)", name or "")
+    return True
+
 # ----- Offline / Online
 def run_migrations_offline() -> None:
     context.configure(
@@ -59,6 +66,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        include_name=include_name,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -71,6 +79,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
+            include_name=include_name,
         )
         with context.begin_transaction():
             context.run_migrations()
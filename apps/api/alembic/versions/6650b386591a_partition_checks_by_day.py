@@ -0,0 +1,106 @@
+"""partition checks by day
+
+Revision ID: 6650b386591a
+Revises: 7c32b49b84da
+Create Date: 2026-10-18 17:08:58.261353
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6650b386591a'
+down_revision: Union[str, Sequence[str], None] = '7c32b49b84da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Daily partitions are named checks_pYYYYMMDD and cover [day, day+1) in UTC.
+# services/partitions.py keeps creating them ahead of time and drops expired ones.
+_CREATE_PARTITIONS = """
+do $$
+declare
+    d date := coalesce(
+        (select min(ts at time zone 'UTC')::date from {source}),
+        (now() at time zone 'UTC')::date
+    );
+    stop date := (now() at time zone 'UTC')::date + 7;
+begin
+    while d <= stop loop
+        execute format(
+            'create table if not exists %I partition of checks for values from (%L) to (%L)',
+            'checks_p' || to_char(d, 'YYYYMMDD'),
+            d::timestamp at time zone 'UTC',
+            (d + 1)::timestamp at time zone 'UTC'
+        );
+        d := d + 1;
+    end loop;
+end $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("alter table checks rename to checks_unpartitioned")
+    op.execute("alter index checks_pkey rename to checks_unpartitioned_pkey")
+    op.drop_index('ix_checks_monitor_id_ts', table_name='checks_unpartitioned')
+    op.drop_index('ix_checks_ts', table_name='checks_unpartitioned')
+    op.drop_index('ix_checks_monitor_id', table_name='checks_unpartitioned')
+
+    # partition key must be part of the primary key
+    op.execute(
+        """
+        create table checks (
+            id bigint not null default nextval('checks_id_seq'),
+            monitor_id varchar not null references monitors(id) on delete cascade,
+            status_code integer not null,
+            ok boolean not null,
+            latency_ms integer not null,
+            ts timestamptz not null default now(),
+            constraint checks_pkey primary key (id, ts)
+        ) partition by range (ts)
+        """
+    )
+    op.create_index('ix_checks_monitor_id_ts', 'checks', ['monitor_id', 'ts'], unique=False)
+    # safety net for rows outside any daily partition; maintenance moves them out
+    op.execute("create table checks_default partition of checks default")
+    op.execute(_CREATE_PARTITIONS.format(source="checks_unpartitioned"))
+
+    op.execute(
+        "insert into checks (id, monitor_id, status_code, ok, latency_ms, ts) "
+        "select id, monitor_id, status_code, ok, latency_ms, ts from checks_unpartitioned"
+    )
+    op.execute("alter sequence checks_id_seq owned by checks.id")
+    op.drop_table('checks_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("alter table checks rename to checks_partitioned")
+    op.execute("alter index checks_pkey rename to checks_partitioned_pkey")
+    op.execute("alter index ix_checks_monitor_id_ts rename to ix_checks_partitioned_monitor_id_ts")
+    op.execute(
+        """
+        create table checks (
+            id bigint not null default nextval('checks_id_seq'),
+            monitor_id varchar not null references monitors(id) on delete cascade,
+            status_code integer not null,
+            ok boolean not null,
+            latency_ms integer not null,
+            ts timestamptz not null default now(),
+            constraint checks_pkey primary key (id)
+        )
+        """
+    )
+    op.execute(
+        "insert into checks (id, monitor_id, status_code, ok, latency_ms, ts) "
+        "select id, monitor_id, status_code, ok, latency_ms, ts from checks_partitioned"
+    )
+    op.execute("alter sequence checks_id_seq owned by checks.id")
+    op.drop_table('checks_partitioned')  # drops every partition with it
+    op.create_index('ix_checks_monitor_id', 'checks', ['monitor_id'], unique=False)
+    op.create_index('ix_checks_ts', 'checks', ['ts'], unique=False)
+    op.create_index('ix_checks_monitor_id_ts', 'checks', ['monitor_id', 'ts'], unique=False)
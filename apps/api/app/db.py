@@ -1,5 +1,6 @@
 # apps/api/app/db.py
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.engine.url import make_url, URL
 
@@ -19,9 +20,22 @@ def _normalize_url(url_str: str) -> URL:
     return url
 
 
-engine = create_engine(_normalize_url(settings.DATABASE_URL), pool_pre_ping=True, future=True)
+_pool_opts = dict(
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+    pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+)
+
+engine = create_engine(_normalize_url(settings.DATABASE_URL), future=True, **_pool_opts)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
+# Same DB through psycopg v3's native asyncio support, for code running on the event loop
+# (scheduler, check writer, hot read endpoints) so a slow query never blocks other tasks.
+async_engine = create_async_engine(_normalize_url(settings.DATABASE_URL), **_pool_opts)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -33,3 +47,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
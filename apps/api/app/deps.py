@@ -1,9 +1,10 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt, os
+import jwt, os, time
 from sqlalchemy.orm import Session
 from .db import get_db
 from .models import User
+from .services import auth_cache
 
 bearer = HTTPBearer(auto_error=False)
 JWT_SECRET = os.getenv("JWT_SECRET", "change-me")
@@ -11,11 +12,23 @@ JWT_SECRET = os.getenv("JWT_SECRET", "change-me")
 def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer), db: Session = Depends(get_db)) -> User:
     if not creds:
         raise HTTPException(401, "Unauthorized")
-    try:
-        payload = jwt.decode(creds.credentials, JWT_SECRET, algorithms=["HS256"])
-    except Exception:
-        raise HTTPException(401, "Invalid token")
-    u = db.get(User, payload.get("sub"))
-    if not u:
-        raise HTTPException(401, "Invalid user")
+    token = creds.credentials
+    payload = auth_cache.tokens.get(token)
+    if payload is None or payload.get("exp", 0) <= time.time():
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        except Exception:
+            raise HTTPException(401, "Invalid token")
+        auth_cache.tokens.put(token, payload)
+
+    # cached rows are detached, read-only snapshots; the session is never
+    # touched on a hit, so no connection is checked out just to authenticate
+    uid = payload.get("sub")
+    u = auth_cache.users.get(uid)
+    if u is None:
+        u = db.get(User, uid)
+        if not u:
+            raise HTTPException(401, "Invalid user")
+        db.expunge(u)
+        auth_cache.users.put(uid, u)
     return u
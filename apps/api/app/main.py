@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+import logging, time
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .db import Base, engine
+from .db import Base, engine, async_engine
 from .routers import monitors, status, demo, auth
-from .services.scheduler import start_scheduler
+from .services import admission, scheduler, latest, metrics
+from .services.demo import snapshot as demo_snapshot
+from .services.scheduler import start_scheduler, stop_scheduler
+
+log = logging.getLogger(__name__)
 
 app = FastAPI(title="Uptime API")
 
@@ -16,8 +22,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Auto-create tables (simple dev bootstrap; swap to Alembic later)
-Base.metadata.create_all(bind=engine)
+# per-route handler latency for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.Gauge(
+    "uptime_db_pool_connections", "DB pool connections by engine and state", ["engine", "state"],
+    fn=lambda: {
+        (name, state): value
+        for name, pool in (("sync", engine.pool), ("async", async_engine.pool))
+        for state, value in (("in_use", pool.checkedout()), ("idle", pool.checkedin()))
+    },
+)
 
 # Routers
 app.include_router(monitors.router)
@@ -29,6 +44,43 @@ app.include_router(auth.router)
 def healthz():
     return {"status": "ok"}
 
+@app.get("/healthz/scheduler")
+async def scheduler_health():
+    # async: lag_stats() reads the wheel's deque, which only the loop may touch
+    # start lag = how long after its phase slot each recent run actually started
+    if scheduler.scheduler is None:
+        return {"running": False}
+    return {"running": True, **scheduler.scheduler.lag_stats(), "admission": admission.controller.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    # async on purpose: render on the loop, which is the only thread that touches the metrics
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.on_event("startup")
 async def _startup():
-    start_scheduler()
+    t0 = time.perf_counter()
+    if settings.DB_CREATE_ALL:
+        # dev bootstrap only; not at import time, so importing the app (workers, alembic, bench) stays cheap
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    t1 = time.perf_counter()
+    if settings.SCHEDULER_IN_API:
+        start_scheduler()  # groups load in the background; it logs its own timing
+    demo_snapshot.start()
+    t2 = time.perf_counter()
+    try:
+        await latest.warm()
+    except Exception:
+        # misses just fall back to the DB
+        log.exception("latest-status cache warm-up failed")
+    t3 = time.perf_counter()
+    log.info(
+        "startup took %.0f ms (create_all %.0f ms, scheduler %.0f ms, latest warm %.0f ms)",
+        (t3 - t0) * 1000, (t1 - t0) * 1000, (t2 - t1) * 1000, (t3 - t2) * 1000,
+    )
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await demo_snapshot.stop()
+    await stop_scheduler()
+    await async_engine.dispose()
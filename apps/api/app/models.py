@@ -1,5 +1,5 @@
-from datetime import datetime
-from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Integer, String, Text, func
+from datetime import date, datetime
+from sqlalchemy import ARRAY, BigInteger, Boolean, Date, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -11,6 +11,8 @@ class Monitor(Base):
     url: Mapped[str] = mapped_column(Text, nullable=False)
     interval_sec: Mapped[int] = mapped_column(Integer, default=60)
     expected_status: Mapped[int] = mapped_column(Integer, default=200)
+    fresh_connection: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")  # probe without keep-alive
+    probe_mode: Mapped[str] = mapped_column(String, default="headers", server_default="headers")  # head | headers | body (services/probe_client.py)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     checks: Mapped[list["Check"]] = relationship(back_populates="monitor", cascade="all, delete-orphan")
@@ -19,23 +21,78 @@ class Monitor(Base):
     user_id = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     owner = relationship("User", backref="monitors")
 
+    __table_args__ = (
+        # group lookups outside the probe path (which uses the scheduler's in-memory registry)
+        Index("ix_monitors_url_interval_sec", "url", "interval_sec"),
+    )
+
 
 
 class Check(Base):
+    # Range-partitioned by day on ts (see services/partitions.py); the partition key has to be in the PK.
     __tablename__ = "checks"
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"), index=True)
+    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"))
     status_code: Mapped[int] = mapped_column(Integer, nullable=False)
     ok: Mapped[bool] = mapped_column(Boolean, nullable=False)
     latency_ms: Mapped[int] = mapped_column(Integer, nullable=False)
-    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), primary_key=True)
+    # where the time went (null when the phase didn't happen, e.g. DNS/connect/TLS on a reused connection)
+    dns_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    connect_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    tls_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    ttfb_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    reused: Mapped[bool | None] = mapped_column(Boolean, nullable=True)   # keep-alive connection reused
 
     monitor: Mapped[Monitor] = relationship(back_populates="checks")
 
+    __table_args__ = (
+        Index("ix_checks_monitor_id_ts", "monitor_id", "ts"),
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
+
+
+class CheckRollupMinute(Base):
+    """Per-minute aggregate of checks, maintained by the check writer (services/rollups.py)."""
+    __tablename__ = "check_rollups_minute"
+    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    n: Mapped[int] = mapped_column(Integer, nullable=False)
+    ok_n: Mapped[int] = mapped_column(Integer, nullable=False)
+    latency_sum: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    latency_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    latency_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)   # services/sketch.py encoding
+
+
+class CheckRollupHour(Base):
+    """Per-hour aggregate of checks; same shape as CheckRollupMinute."""
+    __tablename__ = "check_rollups_hour"
+    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    n: Mapped[int] = mapped_column(Integer, nullable=False)
+    ok_n: Mapped[int] = mapped_column(Integer, nullable=False)
+    latency_sum: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    latency_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    latency_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)   # services/sketch.py encoding
+
+class UptimeDay(Base):
+    """One UTC day of a monitor's checks for the status page history bars (services/history.py)."""
+    __tablename__ = "uptime_days"
+    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    ok_n: Mapped[int] = mapped_column(Integer, nullable=False)
+    fail_n: Mapped[int] = mapped_column(Integer, nullable=False)
+    # outages as flat (start, length) pairs, seconds since midnight UTC
+    down_spans: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False, server_default="{}")
+    last_sec: Mapped[int | None] = mapped_column(Integer, nullable=True)      # latest check folded in so far
+    last_ok: Mapped[bool | None] = mapped_column(Boolean, nullable=True)      # false: the last outage is still open
+
 class Incident(Base):
     __tablename__ = "incidents"
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"), index=True)
+    monitor_id: Mapped[str] = mapped_column(ForeignKey("monitors.id", ondelete="CASCADE"))
     opened_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     resolved_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     reason: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -43,10 +100,25 @@ class Incident(Base):
 
     monitor: Mapped[Monitor] = relationship(back_populates="incidents")
 
+    __table_args__ = (
+        # keyset pagination of a monitor's history (newest first)
+        Index("ix_incidents_monitor_id_opened_at", "monitor_id", "opened_at", "id"),
+        # at most one open incident per monitor (services/incidents.py relies on it)
+        Index("uq_incidents_open", "monitor_id", unique=True, postgresql_where=text("resolved_at is null")),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
     id = mapped_column(String, primary_key=True)           # ulid/uuid
     email = mapped_column(String, unique=True, index=True, nullable=False)
     password_hash = mapped_column(String, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class SchedulerNode(Base):
+    """Lease row for a running scheduler process (see services/cluster.py)."""
+    __tablename__ = "scheduler_nodes"
+    id: Mapped[str] = mapped_column(String, primary_key=True)              # host:pid:rand
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt, datetime
-from ..db import get_db
+from ..db import get_async_db
 from ..models import User
 from ..utils import ulid
+from ..services import passwords
 
 JWT_SECRET = "change-me"  # from env
 JWT_EXP_MIN = 60 * 24 * 7
@@ -24,17 +26,34 @@ class TokenOut(BaseModel):
 
 router = APIRouter(prefix="/v1/auth", tags=["auth"])
 
+def _taken() -> HTTPException:
+    return HTTPException(409, "Email already registered")
+
+def _busy() -> HTTPException:
+    return HTTPException(429, "Too many sign-in attempts right now, please retry", headers={"Retry-After": "1"})
+
 @router.post("/register", response_model=TokenOut)
-def register(body: RegisterIn, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == body.email.lower()).first()
+async def register(body: RegisterIn, db: AsyncSession = Depends(get_async_db)):
+    existing = (await db.execute(select(User.id).where(User.email == body.email.lower()))).first()
     if existing:
-        raise HTTPException(409, "Email already registered")
+        raise _taken()
+    await db.close()  # don't hold a pooled connection through the slow part
+    try:
+        password_hash = await passwords.pool.hash(body.password)
+    except passwords.PasswordPoolBusy:
+        raise _busy()
     u = User(
         id=ulid(),
         email=body.email.lower(),
-        password_hash=bcrypt.hash(body.password),
+        password_hash=password_hash,
     )
-    db.add(u); db.commit()
+    db.add(u)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # a concurrent registration of the same email won the race while we hashed
+        await db.rollback()
+        raise _taken()
     token = jwt.encode(
         {"sub": u.id, "email": u.email, "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_EXP_MIN)},
         JWT_SECRET,
@@ -43,10 +62,14 @@ def register(body: RegisterIn, db: Session = Depends(get_db)):
     return {"access_token": token}
 
 @router.post("/login", response_model=TokenOut)
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    u = db.query(User).filter(User.email == body.email.lower()).first()
-    if not u or not bcrypt.verify(body.password, u.password_hash):
-        raise HTTPException(401, "Invalid credentials")
+async def login(body: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    u = (await db.execute(select(User).where(User.email == body.email.lower()))).scalars().first()
+    await db.close()  # don't hold a pooled connection through the slow part
+    try:
+        if not u or not await passwords.pool.verify(body.password, u.password_hash):
+            raise HTTPException(401, "Invalid credentials")
+    except passwords.PasswordPoolBusy:
+        raise _busy()
     token = jwt.encode(
         {"sub": u.id, "email": u.email, "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_EXP_MIN)},
         JWT_SECRET,
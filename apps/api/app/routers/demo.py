@@ -1,39 +1,14 @@
 # apps/api/app/routers/demo.py
-from fastapi import APIRouter
-from typing import List, Dict
-import asyncio
-import httpx
+from fastapi import APIRouter, Response
+from ..services import demo
 
 router = APIRouter(prefix="/v1/demo", tags=["demo"])
 
-SITES = [
-    {"name": "Google", "url": "https://www.google.com"},
-    {"name": "GitHub", "url": "https://github.com"},
-    {"name": "Vercel", "url": "https://vercel.com"},
-    {"name": "Cloudflare", "url": "https://www.cloudflare.com"},
-]
-
 @router.get("/snapshot")
-async def snapshot() -> List[Dict]:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
-        async def check(site):
-            try:
-                r = await client.get(site["url"])
-                return {
-                    "name": site["name"],
-                    "url": site["url"],
-                    "status_code": r.status_code,
-                    "ok": 200 <= r.status_code < 400,
-                    "latency_ms": int(r.elapsed.total_seconds() * 1000),
-                }
-            except Exception:
-                return {
-                    "name": site["name"],
-                    "url": site["url"],
-                    "status_code": None,
-                    "ok": False,
-                    "latency_ms": None,
-                }
-
-        results = await asyncio.gather(*(check(s) for s in SITES))
-        return list(results)
+async def snapshot():
+    # served from memory; the site checks run on their own schedule (services/demo.py)
+    body = await demo.snapshot.get()
+    max_age = max(0, int(demo.snapshot.refresh_sec - demo.snapshot.age()))
+    return Response(body, media_type="application/json", headers={
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={int(demo.snapshot.stale_sec)}",
+    })
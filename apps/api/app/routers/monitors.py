@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text, tuple_, or_
 from sqlalchemy.exc import IntegrityError
-from ..db import get_db, Base, engine
-from ..models import Monitor, Check, User
-from ..schemas import MonitorCreate, MonitorRead, Summary
-from ..utils import ulid, slugify, unique_slug, normalize_url
-from ..services.scheduler import schedule_monitor, unschedule_monitor
+from ..db import get_db, get_async_db, async_engine, Base, engine
+from ..models import Monitor, Check, User, Incident
+from ..config import settings
+from ..schemas import MonitorCreate, MonitorRead, Summary, IncidentPage, BulkCreateResult, CheckRead, CheckPage, CheckSeries, Overview
+from ..utils import ulid, slugify, unique_slug, normalize_url, allocate_slugs
+from ..services.scheduler import schedule_monitor, schedule_monitors, unschedule_monitor
+from ..services import rollups, latest, status_cache
+from ..services.incidents import incident_engine
 from ..deps import get_current_user
 
 
 router = APIRouter(prefix="/v1/monitors", tags=["monitors"])
 
+SUMMARY_WINDOWS = {"24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+
 @router.post("", response_model=MonitorRead, status_code=201)
 def create_monitor(payload: MonitorCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     base_slug = slugify(payload.name or "Untitled")
@@ -28,6 +39,8 @@ def create_monitor(payload: MonitorCreate, db: Session = Depends(get_db), user:
                 url=norm,                                # store normalized
                 interval_sec=payload.interval_sec,
                 expected_status=payload.expected_status,
+                fresh_connection=payload.fresh_connection,
+                probe_mode=payload.probe_mode,
                 user_id=user.id,
             )
 
@@ -52,10 +65,142 @@ def create_monitor(payload: MonitorCreate, db: Session = Depends(get_db), user:
     # If we somehow failed to get a unique slug after retries:
     raise HTTPException(status_code=409, detail="A monitor with a similar name already exists. Please try a different name.")
 
+def _parse_bulk(body: bytes, content_type: str) -> list:
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(400, "Expected a JSON array of monitors (or NDJSON)")
+    return items
+
+_BULK_COLUMNS = ("id", "slug", "name", "url", "interval_sec", "expected_status", "fresh_connection", "probe_mode", "user_id")
+_BULK_INSERT = text(
+    """
+    insert into monitors (id, slug, name, url, interval_sec, expected_status, fresh_connection, probe_mode, user_id)
+    select * from unnest(
+        cast(:id as text[]), cast(:slug as text[]), cast(:name as text[]), cast(:url as text[]),
+        cast(:interval_sec as int[]), cast(:expected_status as int[]), cast(:fresh_connection as bool[]),
+        cast(:probe_mode as text[]), cast(:user_id as text[])
+    )
+    on conflict (slug) do nothing
+    returning id
+    """
+)
+
+async def _insert_with_slugs(db: AsyncSession, rows: list[dict]) -> set[str]:
+    """Allocate slugs for `rows` in one query and multi-row insert them; returns the ids that went in."""
+    bases = [slugify(r["name"]) for r in rows]
+    uniq = list(dict.fromkeys(bases))
+    # slugify() only emits [a-z0-9-], so nothing to escape in the patterns
+    taken = set((await db.execute(
+        select(Monitor.slug).where(or_(
+            Monitor.slug.in_(uniq),
+            text("slug like any(:likes)").bindparams(likes=[f"{b}-%" for b in uniq]),
+        ))
+    )).scalars())
+    for r, slug in zip(rows, allocate_slugs(bases, taken)):
+        r["slug"] = slug
+
+    # one statement with array params, whatever the batch size;
+    # a slug grabbed by a concurrent create just skips the row, the caller retries those
+    res = await db.execute(_BULK_INSERT, {c: [r[c] for r in rows] for c in _BULK_COLUMNS})
+    return set(res.scalars())
+
+@router.post("/bulk", response_model=BulkCreateResult)
+async def bulk_create_monitors(request: Request, db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
+    """
+    Create many monitors from a JSON array or NDJSON (Content-Type: application/x-ndjson)
+    of MonitorCreate objects. Items are validated independently; the result
+    lists every item in input order. New groups start at their regular phase
+    rather than all being probed right away.
+    """
+    items = _parse_bulk(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(413, f"At most {settings.BULK_CREATE_MAX_ITEMS} monitors per request")
+
+    results: list[dict] = [{"index": i, "ok": False} for i in range(len(items))]
+    rows, row_index = [], []
+    for i, raw in enumerate(items):
+        try:
+            p = MonitorCreate.model_validate(raw)
+        except ValidationError as e:
+            results[i]["error"] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            continue
+        rows.append({
+            "id": ulid(),
+            "name": p.name or "Untitled",
+            "url": normalize_url(str(p.url)),
+            "interval_sec": p.interval_sec,
+            "expected_status": p.expected_status,
+            "fresh_connection": p.fresh_connection,
+            "probe_mode": p.probe_mode,
+            "user_id": user.id,
+        })
+        row_index.append(i)
+
+    pending = list(zip(row_index, rows))
+    for attempt in range(3):
+        if not pending:
+            break
+        inserted = await _insert_with_slugs(db, [r for _, r in pending])
+        await db.commit()
+        for i, r in pending:
+            if r["id"] in inserted:
+                results[i].update(ok=True, monitor=MonitorRead.model_validate(r))
+        pending = [(i, r) for i, r in pending if r["id"] not in inserted]
+    for i, _ in pending:
+        results[i]["error"] = "Could not allocate a unique slug; please retry"
+
+    created = [r for i, r in zip(row_index, rows) if results[i]["ok"]]
+    if created:
+        await run_in_threadpool(schedule_monitors, created)
+    return {"created": len(created), "failed": len(items) - len(created), "results": results}
+
 @router.get("", response_model=list[MonitorRead])
 def list_monitors(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     return db.query(Monitor).filter(Monitor.user_id == user.id).order_by(Monitor.created_at.desc()).all()
 
+# must stay above /{monitor_id}, or "overview" would be taken for an id
+@router.get("/overview", response_model=Overview)
+async def monitors_overview(
+    range: str = "24h",
+    limit: int | None = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    """Every monitor of the user with its summary and latest check, in a fixed number of queries."""
+    q = select(Monitor).where(Monitor.user_id == user.id).order_by(Monitor.created_at.desc(), Monitor.id).offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    ms = (await db.execute(q)).scalars().all()
+    # a short page that isn't past the end tells us the total without counting
+    last_page = (limit is None or len(ms) < limit) and (ms or offset == 0)
+    total = offset + len(ms) if last_page else (await db.execute(
+        select(func.count()).select_from(Monitor).where(Monitor.user_id == user.id)
+    )).scalar()
+
+    window = SUMMARY_WINDOWS.get(range, SUMMARY_WINDOWS["24h"])
+    now = datetime.now(timezone.utc)
+    ids = [m.id for m in ms]
+    totals = await rollups.window_totals_many(db, ids, now - window, now)
+    lasts = await latest.get_latest_many(db, [(m.id, m.interval_sec) for m in ms])
+
+    items = []
+    for m in ms:
+        n, okc, lat_sum = totals.get(m.id, (0, 0, 0))
+        items.append({
+            **MonitorRead.model_validate(m).model_dump(),
+            "samples": n,
+            "uptime_pct": round(okc / n * 100.0, 2) if n else 0.0,
+            "avg_latency_ms": (lat_sum / n) if n else None,
+            "last": lasts.get(m.id),
+        })
+    return {"range": range, "total": total, "monitors": items}
+
 @router.get("/{monitor_id}", response_model=MonitorRead)
 def get_monitor(monitor_id: str, db: Session = Depends(get_db)):
     m = db.get(Monitor, monitor_id)
@@ -67,48 +212,130 @@ def delete_monitor(monitor_id: str, db: Session = Depends(get_db), user: User =
     m = db.get(Monitor, monitor_id)
     if not m or m.user_id != user.id:
         raise HTTPException(404, "Monitor not found")
-    unschedule_monitor(m)
     db.delete(m); db.commit()
+    unschedule_monitor(m)  # only once it's really gone
+    latest.cache.discard(monitor_id)
+    status_cache.cache.discard(m.slug)
+    incident_engine.forget(monitor_id)
 
 @router.get("/{monitor_id}/summary", response_model=Summary)
-def monitor_summary(monitor_id: str, range: str = "24h", db: Session = Depends(get_db)):
-    m = db.get(Monitor, monitor_id)
+async def monitor_summary(monitor_id: str, range: str = "24h", db: AsyncSession = Depends(get_async_db)):
+    m = await db.get(Monitor, monitor_id)
     if not m:
         raise HTTPException(404, "Monitor not found")
 
-    # whitelist -> human string we’ll cast to interval
-    window_map = {"24h": "24 hours", "7d": "7 days", "30d": "30 days"}
-    window_str = window_map.get(range, "24 hours")
-
-    q = db.execute(
-        text(
-            """
-            select count(*) as n,
-                   sum(case when ok then 1 else 0 end) as ok_count,
-                   avg(latency_ms)::float as avg_latency
-            from checks
-            where monitor_id = :mid
-              and ts >= now() - (:window)::interval
-            """
-        ),
-        {"mid": monitor_id, "window": window_str},
-    ).mappings().first()
-
-    n = int(q["n"] or 0)
-    okc = int(q["ok_count"] or 0)
-    avg_lat = float(q["avg_latency"]) if q["avg_latency"] is not None else None
+    # whitelist -> window length; rollups make every window roughly the same cost
+    window = SUMMARY_WINDOWS.get(range, SUMMARY_WINDOWS["24h"])
+    now = datetime.now(timezone.utc)
+    n, okc, lat_sum, sketch = await rollups.window_stats(db, monitor_id, now - window, now)
+
+    avg_lat = (lat_sum / n) if n > 0 else None
+    pct = lambda q: round(v, 1) if (v := sketch.quantile(q)) is not None else None
     uptime = (okc / n * 100.0) if n > 0 else 0.0
 
-    last = db.execute(
-        text("select ok from checks where monitor_id=:mid order by ts desc limit 1"),
-        {"mid": monitor_id},
-    ).first()
-    last_ok = bool(last[0]) if last is not None else None
+    last = await latest.get_latest(db, monitor_id, m.interval_sec)
+    last_ok = bool(last["ok"]) if last is not None else None
 
     return {
         "range": range,
         "samples": n,
         "uptime_pct": round(uptime, 2),
         "avg_latency_ms": avg_lat,
+        "p50_latency_ms": pct(0.50),
+        "p95_latency_ms": pct(0.95),
+        "p99_latency_ms": pct(0.99),
         "last_ok": last_ok,
-    }
\ No newline at end of file
+    }
+
+def _make_cursor(ts: datetime, id: int) -> str:
+    # no '+' in it, so it survives being pasted into a query string unencoded
+    return f"{ts.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%S.%fZ}|{id}"
+
+def _parse_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        at, _, iid = cursor.rpartition("|")
+        return datetime.fromisoformat(at), int(iid)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+@router.get("/{monitor_id}/incidents", response_model=IncidentPage)
+async def monitor_incidents(monitor_id: str, limit: int = Query(50, ge=1, le=500), cursor: str | None = None,
+                            db: AsyncSession = Depends(get_async_db)):
+    m = await db.get(Monitor, monitor_id)
+    if not m:
+        raise HTTPException(404, "Monitor not found")
+
+    # newest first; keyset on (opened_at, id) so deep pages cost the same as the first
+    q = select(Incident).where(Incident.monitor_id == monitor_id)
+    if cursor:
+        q = q.where(tuple_(Incident.opened_at, Incident.id) < _parse_cursor(cursor))
+    q = q.order_by(Incident.opened_at.desc(), Incident.id.desc()).limit(limit + 1)
+    items = (await db.execute(q)).scalars().all()
+
+    more = len(items) > limit
+    items = items[:limit]
+    return {"items": items, "next_cursor": _make_cursor(items[-1].opened_at, items[-1].id) if more else None}
+
+_CHECK_COLS = (
+    Check.id, Check.status_code, Check.ok, Check.latency_ms, Check.ts,
+    Check.dns_ms, Check.connect_ms, Check.tls_ms, Check.ttfb_ms, Check.reused,
+)
+
+async def _stream_checks(monitor_id: str, start: datetime, end: datetime):
+    # own connection: the request's session is closed before a streamed body is sent
+    async with async_engine.connect() as conn:
+        rows = await conn.stream(
+            select(*_CHECK_COLS)
+            .where(Check.monitor_id == monitor_id, Check.ts >= start, Check.ts < end)
+            .order_by(Check.ts, Check.id)
+            .execution_options(yield_per=1000)   # server-side cursor, 1000 rows per fetch
+        )
+        async for chunk in rows.partitions():
+            yield "".join(
+                CheckRead.model_validate(r, from_attributes=True).model_dump_json() + "\n" for r in chunk
+            )
+
+@router.get("/{monitor_id}/checks", response_model=CheckPage | CheckSeries)
+async def monitor_checks(
+    monitor_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: str | None = None,
+    points: int | None = Query(None, ge=1, le=5000),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Check history in [start, end), oldest first (default: the last 24h).
+
+    - default: pages of raw checks, keyset-paginated on (ts, id) via `cursor`
+    - `points=N`: at most N downsampled buckets (count, ok, min/max/avg latency),
+      read from the rollups when the bucket width allows
+    - `format=ndjson`: every raw check in the range, streamed from a server-side cursor
+    """
+    m = await db.get(Monitor, monitor_id)
+    if not m:
+        raise HTTPException(404, "Monitor not found")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    start, end = (t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (start, end))
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+
+    if points is not None:
+        w, series = await rollups.series(db, monitor_id, start, end, points)
+        return {"bucket_sec": w, "points": series}
+
+    if format == "ndjson":
+        await db.close()
+        return StreamingResponse(_stream_checks(monitor_id, start, end), media_type="application/x-ndjson")
+
+    q = select(*_CHECK_COLS).where(Check.monitor_id == monitor_id, Check.ts >= start, Check.ts < end)
+    if cursor:
+        q = q.where(tuple_(Check.ts, Check.id) > _parse_cursor(cursor))
+    rows = (await db.execute(q.order_by(Check.ts, Check.id).limit(limit + 1))).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"items": rows, "next_cursor": _make_cursor(rows[-1].ts, rows[-1].id) if more else None}
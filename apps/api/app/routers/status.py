@@ -1,36 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from ..db import get_db
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..db import AsyncSessionLocal, get_async_db
 from ..models import Monitor
-from ..schemas import StatusPage
+from ..schemas import StatusHistory, StatusPage
+from ..services import history, latest
+from ..services.status_cache import CachedPage, cache, make_page
 
 router = APIRouter(prefix="/v1/status", tags=["status"])
 
+async def _build(slug: str) -> CachedPage:
+    # own session: the build is shared by every request waiting on this slug
+    async with AsyncSessionLocal() as db:
+        m = (await db.execute(select(Monitor).where(Monitor.slug == slug))).scalars().first()
+        if not m:
+            return make_page(None, None, settings.STATUS_CACHE_MISSING_TTL_SEC)
+        last = await latest.get_latest(db, m.id, m.interval_sec)
+
+    page = StatusPage(slug=slug, monitors=[{
+        "id": m.id,
+        "name": m.name,
+        "url": m.url,
+        "interval_sec": m.interval_sec,
+        "expected_status": m.expected_status,
+        "last": last
+    }])
+    # good until the next check should have landed, never longer than one interval
+    if last:
+        ttl = last["ts"].timestamp() + m.interval_sec + settings.LATEST_CACHE_GRACE_SEC - datetime.now(timezone.utc).timestamp()
+    else:
+        ttl = settings.STATUS_CACHE_MIN_TTL_SEC
+    ttl = min(max(ttl, settings.STATUS_CACHE_MIN_TTL_SEC), m.interval_sec)
+    return make_page(page.model_dump_json().encode(), last["ts"] if last else m.created_at, ttl)
+
+def _not_modified(request: Request, page: CachedPage) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return page.etag in [t.strip().removeprefix("W/") for t in inm.split(",")] or inm.strip() == "*"
+    ims = request.headers.get("if-modified-since")
+    if ims and page.last_modified is not None:
+        try:
+            return page.last_modified.replace(microsecond=0) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @router.get("/{slug}", response_model=StatusPage)
-def public_status(slug: str, db: Session = Depends(get_db)):
-    m = db.query(Monitor).filter(Monitor.slug == slug).first()
-    if not m:
+async def public_status(slug: str, request: Request):
+    page = await cache.get(slug, lambda: _build(slug))
+    if page.body is None:
         raise HTTPException(404, "Not found")
 
-    row = db.execute(
-        text(
-            "select status_code, ok, latency_ms, ts "
-            "from checks where monitor_id=:mid order by ts desc limit 1"
-        ),
-        {"mid": m.id},
-    ).mappings().first()
+    age = page.max_age()
+    headers = {
+        "ETag": page.etag,
+        # let a CDN keep serving the old page while it refetches
+        "Cache-Control": f"public, max-age={age}, stale-while-revalidate={settings.STATUS_CACHE_SWR_SEC}",
+    }
+    if page.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(page.last_modified.astimezone(timezone.utc), usegmt=True)
+    if _not_modified(request, page):
+        return Response(status_code=304, headers=headers)
+    return Response(page.body, media_type="application/json", headers=headers)
 
-    last = dict(row) if row else None
-
-    return {
-        "slug": slug,
-        "monitors": [{
-            "id": m.id,
-            "name": m.name,
-            "url": m.url,
-            "interval_sec": m.interval_sec,
-            "expected_status": m.expected_status,
-            "last": last
-        }]
-    }
\ No newline at end of file
+@router.get("/{slug}/history", response_model=StatusHistory)
+async def status_history(
+    slug: str,
+    response: Response,
+    days: int = Query(90, ge=1, le=366),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Per-day uptime bars from the daily history (one indexed read, however many checks that is)."""
+    bars = await history.status_history(db, slug, days)
+    if bars is None:
+        raise HTTPException(404, "Not found")
+    response.headers["Cache-Control"] = (
+        f"public, max-age={settings.STATUS_HISTORY_MAX_AGE_SEC}, stale-while-revalidate={settings.STATUS_CACHE_SWR_SEC}"
+    )
+    return {"slug": slug, "days": bars}
@@ -1,11 +1,15 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
+from datetime import date, datetime
 
 class MonitorCreate(BaseModel):
     name: str
     url: HttpUrl
     interval_sec: int = Field(ge=10, le=3600, default=60)
     expected_status: int = 200
+    fresh_connection: bool = False   # measure cold-connection latency (new DNS/TCP/TLS every check)
+    # head: HEAD request; headers: GET, stop at the headers; body: GET and read up to PROBE_MAX_BODY_BYTES
+    probe_mode: Literal["head", "headers", "body"] = "headers"
 
 class MonitorRead(BaseModel):
     id: str
@@ -14,21 +18,96 @@ class MonitorRead(BaseModel):
     url: str
     interval_sec: int
     expected_status: int
+    fresh_connection: bool
+    probe_mode: str
     class Config: from_attributes = True
 
+class BulkItemResult(BaseModel):
+    index: int                         # position in the uploaded array / NDJSON line number (0-based)
+    ok: bool
+    monitor: MonitorRead | None = None
+    error: str | None = None
+
+class BulkCreateResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
+
 class CheckRead(BaseModel):
     status_code: int
     ok: bool
     latency_ms: int
-    ts: str
+    ts: datetime
+    dns_ms: int | None = None
+    connect_ms: int | None = None
+    tls_ms: int | None = None
+    ttfb_ms: int | None = None
+    reused: bool | None = None
+
+class CheckPage(BaseModel):
+    items: list[CheckRead]
+    next_cursor: str | None   # pass back as ?cursor= for the next page
+
+class SeriesPoint(BaseModel):
+    ts: datetime              # bucket start
+    n: int
+    ok_n: int
+    latency_min: int
+    latency_max: int
+    latency_avg: float
+
+class CheckSeries(BaseModel):
+    bucket_sec: float
+    points: list[SeriesPoint]
 
 class Summary(BaseModel):
     range: str
     samples: int
     uptime_pct: float
     avg_latency_ms: float | None
+    p50_latency_ms: float | None
+    p95_latency_ms: float | None
+    p99_latency_ms: float | None
     last_ok: bool | None
 
+class MonitorOverview(MonitorRead):
+    samples: int
+    uptime_pct: float
+    avg_latency_ms: float | None
+    last: CheckRead | None
+
+class Overview(BaseModel):
+    range: str
+    total: int                # all of the user's monitors, for paging
+    monitors: list[MonitorOverview]
+
+class IncidentRead(BaseModel):
+    id: int
+    opened_at: datetime
+    resolved_at: datetime | None
+    reason: str | None
+    last_status_code: int | None
+    class Config: from_attributes = True
+
+class IncidentPage(BaseModel):
+    items: list[IncidentRead]
+    next_cursor: str | None   # pass back as ?cursor= for the next (older) page
+
 class StatusPage(BaseModel):
     slug: str
     monitors: list[dict]
+
+class Outage(BaseModel):
+    start: datetime
+    duration_sec: int         # up to the first ok check after it (so far, if still down)
+
+class HistoryDay(BaseModel):
+    day: date                 # UTC
+    checks: int
+    uptime_pct: float | None  # None: no checks that day
+    downtime_sec: int
+    outages: list[Outage]
+
+class StatusHistory(BaseModel):
+    slug: str
+    days: list[HistoryDay]    # oldest first, today last
@@ -0,0 +1,166 @@
+# apps/api/app/services/admission.py
+import asyncio, heapq, itertools, time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from ..config import settings
+from . import metrics
+
+
+@dataclass(eq=False)
+class _Host:
+    tokens: float
+    t: float                      # time.monotonic() of the last refill
+    queue: List[Tuple[float, int, asyncio.Future]] = field(default_factory=list)  # (deadline, seq, waiter) heap
+    ver: int = 0                  # bumped on every (re)placement; stale heap entries are skipped
+
+
+class AdmissionController:
+    """
+    Gate in front of every probe.
+
+    Two limits: at most `max_in_flight` probes running at once (sockets,
+    event loop time), and a token bucket per target host (`rate` probes/sec,
+    bursts of `burst`) so groups that share a customer's server don't all
+    hit it in the same tick.
+
+    A probe that can't start right away queues with a deadline (the point
+    after which its result would be stale). Queued probes are admitted
+    earliest deadline first; hosts that are out of tokens sleep until their
+    next token without holding up other hosts. Probes still queued at their
+    deadline are skipped, not run late.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = settings.PROBE_MAX_IN_FLIGHT,
+        rate: float = settings.PROBE_HOST_RATE,
+        burst: float = settings.PROBE_HOST_BURST,
+    ):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.in_flight = 0
+        self.queued = 0
+        self._hosts: Dict[str, _Host] = {}
+        self._ready: List[Tuple[float, int, int, str]] = []     # (head deadline, seq, ver, host): has a token
+        self._sleeping: List[Tuple[float, int, int, str]] = []  # (token at, seq, ver, host): waiting to refill
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._created = 0
+
+    def _refill(self, h: _Host, now: float):
+        h.tokens = min(self.burst, h.tokens + (now - h.t) * self.rate)
+        h.t = now
+
+    def _host(self, host: str, now: float) -> _Host:
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = _Host(tokens=self.burst, t=now)
+            self._created += 1
+            if self._created % 4096 == 0:
+                self._prune(now)
+        return h
+
+    def _prune(self, now: float):
+        """Forget idle hosts whose bucket is full again (same as never seen)."""
+        for name, h in list(self._hosts.items()):
+            if not h.queue and h.tokens + (now - h.t) * self.rate >= self.burst:
+                del self._hosts[name]
+
+    def _place(self, name: str, h: _Host, now: float):
+        """Put a host with queued probes on the ready or the sleeping heap."""
+        while h.queue and h.queue[0][2].done():  # waiters that gave up
+            heapq.heappop(h.queue)
+        h.ver += 1
+        if not h.queue:
+            return
+        self._refill(h, now)
+        if h.tokens >= 1:
+            heapq.heappush(self._ready, (h.queue[0][0], next(self._seq), h.ver, name))
+        else:
+            heapq.heappush(self._sleeping, (now + (1 - h.tokens) / self.rate, next(self._seq), h.ver, name))
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._sleeping and self._sleeping[0][0] <= now:
+            _, _, ver, name = heapq.heappop(self._sleeping)
+            h = self._hosts.get(name)
+            if h is not None and h.ver == ver:
+                self._place(name, h, now)
+
+        while self._ready and self.in_flight < self.max_in_flight:
+            _, _, ver, name = heapq.heappop(self._ready)
+            h = self._hosts.get(name)
+            if h is None or h.ver != ver:
+                continue
+            while h.queue and h.queue[0][2].done():
+                heapq.heappop(h.queue)
+            if h.queue:
+                self._refill(h, now)
+                if h.tokens >= 1:
+                    h.tokens -= 1
+                    self.in_flight += 1
+                    heapq.heappop(h.queue)[2].set_result(True)
+            self._place(name, h, now)
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._sleeping:
+            self._timer = asyncio.get_running_loop().call_later(max(0.0, self._sleeping[0][0] - now), self._dispatch)
+
+    async def acquire(self, url: str, max_wait: float) -> bool:
+        """
+        Wait for a slot to probe `url`. False means the probe should be
+        skipped: nothing freed up within `max_wait` seconds. Every True must
+        be paired with release().
+        """
+        name = urlsplit(url).hostname or ""
+        now = time.monotonic()
+        h = self._host(name, now)
+        if not h.queue and not self._ready and self.in_flight < self.max_in_flight:
+            self._refill(h, now)
+            if h.tokens >= 1:
+                h.tokens -= 1
+                self.in_flight += 1
+                return True
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(h.queue, (now + max_wait, next(self._seq), fut))
+        if len(h.queue) == 1 or h.queue[0][2] is fut:
+            self._place(name, h, now)  # new head (earlier deadline) or first waiter
+        self._dispatch()
+        if fut.done():
+            return True  # a slot was free after all
+        metrics.PROBE_ADMISSION_DELAYED.inc()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(fut, max_wait)
+            return True
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                return True  # admitted as the deadline hit (3.12+ wait_for still raises); the slot is ours
+            metrics.PROBE_ADMISSION_SKIPPED.inc()
+            return False
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # admitted just as we were cancelled
+            raise
+        finally:
+            self.queued -= 1
+            metrics.PROBE_ADMISSION_WAIT.observe(time.monotonic() - now)
+
+    def release(self):
+        self.in_flight -= 1
+        if self._ready or self._sleeping:
+            self._dispatch()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "queued": self.queued, "hosts": len(self._hosts)}
+
+
+controller = AdmissionController()
+
+metrics.Gauge("uptime_probe_admission_queued", "Probes waiting for a global or per-host slot", fn=lambda: controller.queued)
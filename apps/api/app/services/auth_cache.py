@@ -0,0 +1,71 @@
+# apps/api/app/services/auth_cache.py
+import threading, time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from sqlalchemy import event, inspect
+
+from ..config import settings
+from ..models import User
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU with a per-entry TTL. get_current_user runs in the
+    threadpool, so every access takes the lock (held for a dict op only).
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key: Hashable, value: Any, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# bearer token -> verified claims; skips the signature check on repeat requests
+tokens = TTLCache(settings.AUTH_CACHE_MAX, settings.AUTH_CACHE_TTL_SEC)
+# user id -> detached User row; skips the users lookup
+users = TTLCache(settings.AUTH_CACHE_MAX, settings.AUTH_CACHE_TTL_SEC)
+
+
+def invalidate_user(user_id: str):
+    users.pop(user_id)
+
+
+# Drop cached rows when a user is deleted or their password changes through
+# the ORM in this process. Other processes notice within AUTH_CACHE_TTL_SEC.
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User):
+    invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User):
+    if inspect(target).attrs.password_hash.history.has_changes():
+        invalidate_user(target.id)
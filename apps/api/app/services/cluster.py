@@ -0,0 +1,171 @@
+# apps/api/app/services/cluster.py
+import asyncio, bisect, json, logging, os, socket, time, uuid
+from typing import Awaitable, Callable, List, Tuple
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.engine.url import make_url
+
+from ..config import settings
+from ..db import async_engine, engine
+from .timing_wheel import stable_hash
+
+log = logging.getLogger(__name__)
+
+# NOTIFY channel used to tell every scheduler node about group changes
+CHANNEL = "uptime_groups"
+MEMBERS_CHANGED = '{"op": "members"}'
+
+
+def _conninfo() -> str:
+    # plain libpq URL for a raw psycopg connection (LISTEN needs a dedicated one)
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+# NOTIFY payloads must stay under 8000 bytes; bulk changes are split into chunks
+_PAYLOAD_MAX = 7000
+
+
+def publish_group_changes(op: str, monitors: List[list], immediate: bool = False):
+    """
+    Tell all scheduler nodes that monitors joined or left their (url, interval)
+    groups: "add" rows are [url, interval, id, expected_status, fresh_connection,
+    probe_mode], "remove" rows [url, interval, id].
+    Sync on purpose: called from the (threadpool) monitor routes.
+    """
+    payloads, chunk, size = [], [], 0
+    for row in monitors:
+        n = len(json.dumps(row)) + 2
+        if chunk and size + n > _PAYLOAD_MAX:
+            payloads.append(chunk)
+            chunk, size = [], 0
+        chunk.append(row)
+        size += n
+    if chunk:
+        payloads.append(chunk)
+    with engine.begin() as conn:
+        for c in payloads:
+            conn.execute(
+                text("select pg_notify(:ch, :payload)"),
+                {"ch": CHANNEL, "payload": json.dumps({"op": op, "monitors": c, "immediate": immediate})},
+            )
+
+
+class Cluster:
+    """
+    Splits (url, interval) groups across live scheduler processes.
+
+    Every node keeps a lease row in `scheduler_nodes` and renews it every
+    CLUSTER_HEARTBEAT_SEC; a node whose lease is older than CLUSTER_LEASE_SEC
+    is considered dead. Ownership is a consistent-hash ring over the live
+    node ids, so every node computes the same owner for a group without
+    talking to the others, and a join/leave only moves ~1/N of the groups.
+
+    A node that can't renew its own lease gives up all of its groups once
+    the lease would have expired, so a partitioned node stops probing at
+    about the time the others take its groups over.
+    """
+
+    VNODES = 64
+
+    def __init__(self, node_id: str | None = None):
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.nodes: List[str] = []
+        self._ring: List[Tuple[int, str]] = []
+        self._ring_hashes: List[int] = []
+        self._last_renewed = 0.0
+        self._poke = asyncio.Event()
+
+    def _build_ring(self, nodes: List[str]):
+        ring = sorted((stable_hash(f"{n}#{i}"), n) for n in nodes for i in range(self.VNODES))
+        self.nodes = nodes
+        self._ring = ring
+        self._ring_hashes = [h for h, _ in ring]
+
+    def owner(self, key_hash: int) -> str | None:
+        if not self._ring:
+            return None
+        i = bisect.bisect(self._ring_hashes, key_hash) % len(self._ring)
+        return self._ring[i][1]
+
+    def owns(self, key_hash: int) -> bool:
+        return self.owner(key_hash) == self.node_id
+
+    async def heartbeat(self) -> bool:
+        """Renew our lease and refresh membership. Returns True if membership changed."""
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "insert into scheduler_nodes (id, heartbeat_at) values (:id, now()) "
+                        "on conflict (id) do update set heartbeat_at = now()"
+                    ),
+                    {"id": self.node_id},
+                )
+                # reap long-dead rows so the table doesn't grow with every restart
+                await conn.execute(
+                    text("delete from scheduler_nodes where heartbeat_at < now() - make_interval(secs => :gc)"),
+                    {"gc": settings.CLUSTER_LEASE_SEC * 20},
+                )
+                live = (await conn.execute(
+                    text("select id from scheduler_nodes where heartbeat_at > now() - make_interval(secs => :ttl) order by id"),
+                    {"ttl": settings.CLUSTER_LEASE_SEC},
+                )).scalars().all()
+                if self.node_id not in self.nodes:
+                    # we just joined: have everyone refresh now rather than on their next heartbeat
+                    await conn.execute(text("select pg_notify(:ch, :p)"), {"ch": CHANNEL, "p": MEMBERS_CHANGED})
+            self._last_renewed = time.monotonic()
+        except Exception:
+            log.exception("scheduler lease renewal failed")
+            if self.nodes and time.monotonic() - self._last_renewed > settings.CLUSTER_LEASE_SEC:
+                log.warning("lease for %s expired; releasing all groups", self.node_id)
+                self._build_ring([])
+                return True
+            return False
+
+        if live != self.nodes:
+            log.info("scheduler membership: %s (me=%s)", live, self.node_id)
+            self._build_ring(list(live))
+            return True
+        return False
+
+    def poke(self):
+        """Renew + refresh membership now (another node joined or left)."""
+        self._poke.set()
+
+    async def run(self, on_change: Callable[[], None]):
+        while True:
+            if await self.heartbeat():
+                on_change()
+            try:
+                await asyncio.wait_for(self._poke.wait(), settings.CLUSTER_HEARTBEAT_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._poke.clear()
+
+    async def listen(self, on_event: Callable[[dict], None], on_reconnect: Callable[[], Awaitable[None]]):
+        """LISTEN for group changes; resync from the DB after every (re)connect."""
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(_conninfo(), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    await on_reconnect()
+                    async for n in conn.notifies():
+                        try:
+                            on_event(json.loads(n.payload))
+                        except Exception:
+                            log.exception("bad group notification: %r", n.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("group listener disconnected; retrying")
+                await asyncio.sleep(2)
+
+    async def leave(self):
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(text("delete from scheduler_nodes where id = :id"), {"id": self.node_id})
+                await conn.execute(text("select pg_notify(:ch, :p)"), {"ch": CHANNEL, "p": MEMBERS_CHANGED})
+        except Exception:
+            log.exception("failed to release scheduler lease")
@@ -0,0 +1,91 @@
+# apps/api/app/services/demo.py
+import asyncio, json, logging, time
+from typing import Dict, List
+
+from ..config import settings
+from .probe_client import get_probe_client
+
+log = logging.getLogger(__name__)
+
+
+async def _check(site: Dict[str, str]) -> Dict:
+    res = await get_probe_client().probe(site["url"])
+    return {
+        "name": site["name"],
+        "url": site["url"],
+        "status_code": res.status_code,
+        "ok": res.status_code is not None and 200 <= res.status_code < 400,
+        "latency_ms": res.latency_ms,
+    }
+
+
+class DemoSnapshot:
+    """
+    The demo page's site checks, probed in the background every
+    `refresh` seconds and kept as a ready-to-send JSON body, so page views
+    never cause outbound requests of their own.
+
+    If the background loop falls behind (or isn't running, e.g. in a
+    process without the startup hook), a request still gets the last body
+    right away as long as it is younger than refresh + stale, and kicks off
+    one refresh. Only when there is nothing usable do requests wait, and
+    then all of them wait on the same refresh (single-flight).
+    """
+
+    def __init__(self, sites: List[Dict[str, str]] = settings.DEMO_SITES,
+                 refresh: float = settings.DEMO_REFRESH_SEC, stale: float = settings.DEMO_STALE_SEC):
+        self.sites = sites
+        self.refresh_sec = refresh
+        self.stale_sec = stale
+        self.body: bytes | None = None
+        self.updated = 0.0  # time.time() of the last refresh
+        self._inflight: asyncio.Task | None = None
+        self._loop_task: asyncio.Task | None = None
+
+    def age(self) -> float:
+        return time.time() - self.updated
+
+    async def _build(self):
+        results = await asyncio.gather(*(_check(s) for s in self.sites))
+        self.body = json.dumps(results).encode()
+        self.updated = time.time()
+
+    def refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already running; returns the running one."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.get_running_loop().create_task(self._build())
+        return self._inflight
+
+    async def get(self) -> bytes:
+        if self.body is not None:
+            age = self.age()
+            if age < self.refresh_sec:
+                return self.body
+            if age < self.refresh_sec + self.stale_sec:
+                self.refresh()  # serve stale, revalidate in the background
+                return self.body
+        # shield: a client hanging up must not cancel the refresh the others are waiting on
+        await asyncio.shield(self.refresh())
+        return self.body
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("demo snapshot refresh failed")
+            await asyncio.sleep(self.refresh_sec)
+
+    def start(self):
+        if self._loop_task is None and self.sites:
+            self._loop_task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        for t in (self._loop_task, self._inflight):
+            if t is not None:
+                t.cancel()
+        await asyncio.gather(*(t for t in (self._loop_task, self._inflight) if t is not None), return_exceptions=True)
+        self._loop_task = self._inflight = None
+
+
+snapshot = DemoSnapshot()
@@ -0,0 +1,186 @@
+# apps/api/app/services/dns_cache.py
+import asyncio, ipaddress, logging, socket, time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List
+
+import dns.asyncresolver
+import dns.exception
+import httpcore
+
+from ..config import settings
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+DNS_LOOKUPS = metrics.Counter("uptime_dns_lookups", "Probe hostname lookups by result", ["result"])
+_HIT, _MISS, _ERROR = DNS_LOOKUPS.labels("hit"), DNS_LOOKUPS.labels("miss"), DNS_LOOKUPS.labels("error")
+
+
+class DNSCache:
+    """
+    Per-process host -> addresses cache for the probes.
+
+    Answers from dnspython keep the record TTL (clamped to
+    [DNS_CACHE_MIN_TTL_SEC, DNS_CACHE_MAX_TTL_SEC]). Names the DNS servers
+    don't know (/etc/hosts entries, "localhost", no resolv.conf) go through
+    the system resolver, whose answers carry no TTL, so those get
+    DNS_CACHE_FALLBACK_TTL_SEC. Failures are cached briefly too, so a dead
+    domain monitored by many users costs one lookup per negative TTL.
+    Concurrent lookups of the same name share one query.
+    """
+
+    def __init__(self, max_entries: int = settings.DNS_CACHE_MAX):
+        self.max_entries = max_entries
+        # host -> (addresses or None for a failed lookup, expires at time.monotonic())
+        self._entries: "OrderedDict[str, tuple[List[str] | None, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._resolver: dns.asyncresolver.Resolver | None = None
+        self._resolver_failed = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def resolve(self, host: str, timeout: float | None = None) -> List[str]:
+        item = self._entries.get(host)
+        if item is not None and item[1] > time.monotonic():
+            self._entries.move_to_end(host)
+            _HIT.inc()
+            if item[0] is None:
+                raise httpcore.ConnectError(f"could not resolve {host!r} (cached)")
+            return item[0]
+
+        _MISS.inc()
+        task = self._inflight.get(host)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._lookup(host))
+            self._inflight[host] = task
+            task.add_done_callback(lambda t, host=host: self._inflight.pop(host, None))
+        try:
+            # shield: one probe timing out must not cancel the lookup others are waiting on
+            addrs = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise httpcore.ConnectTimeout(f"resolving {host!r} timed out")
+        if addrs is None:
+            raise httpcore.ConnectError(f"could not resolve {host!r}")
+        return addrs
+
+    async def resolve_uncached(self, host: str, timeout: float | None = None) -> List[str]:
+        """A fresh lookup that neither reads nor fills the cache (cold probes)."""
+        try:
+            addrs, _ = await asyncio.wait_for(self._resolve(host), timeout)
+        except asyncio.TimeoutError:
+            raise httpcore.ConnectTimeout(f"resolving {host!r} timed out")
+        if addrs is None:
+            raise httpcore.ConnectError(f"could not resolve {host!r}")
+        return addrs
+
+    async def _resolve(self, host: str) -> tuple[List[str] | None, float]:
+        addrs, ttl = await self._query(host)
+        if addrs is None:
+            addrs, ttl = await self._system(host)
+        return addrs, ttl
+
+    async def _lookup(self, host: str) -> List[str] | None:
+        addrs, ttl = await self._resolve(host)
+        if addrs is None:
+            _ERROR.inc()
+            ttl = settings.DNS_CACHE_NEGATIVE_TTL_SEC
+        self._entries[host] = (addrs, time.monotonic() + ttl)
+        self._entries.move_to_end(host)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return addrs
+
+    def _get_resolver(self) -> dns.asyncresolver.Resolver | None:
+        if self._resolver is None and not self._resolver_failed:
+            try:
+                self._resolver = dns.asyncresolver.Resolver()
+            except Exception:
+                log.warning("no usable resolver configuration; probe DNS goes through getaddrinfo only")
+                self._resolver_failed = True
+        return self._resolver
+
+    async def _query(self, host: str) -> tuple[List[str] | None, float]:
+        resolver = self._get_resolver()
+        if resolver is None:
+            return None, 0
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = await resolver.resolve(host, rdtype, search=True)
+            except dns.exception.DNSException:
+                continue
+            ttl = min(max(answer.rrset.ttl, settings.DNS_CACHE_MIN_TTL_SEC), settings.DNS_CACHE_MAX_TTL_SEC)
+            return [r.address for r in answer], ttl
+        return None, 0
+
+    async def _system(self, host: str) -> tuple[List[str] | None, float]:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except OSError:
+            return None, 0
+        return list(dict.fromkeys(info[4][0] for info in infos)) or None, settings.DNS_CACHE_FALLBACK_TTL_SEC
+
+    def clear(self):
+        self._entries.clear()
+
+
+cache = DNSCache()
+
+# where CachingBackend reports the lookup time of the probe running in this task
+current_dns_ms: ContextVar[list | None] = ContextVar("current_dns_ms", default=None)
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class CachingBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that resolves hostnames through `cache` and
+    connects to the address directly. TLS SNI/verification and the Host
+    header still use the hostname (httpcore passes those separately).
+    """
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend | None = None):
+        self._inner = inner or httpcore.AnyIOBackend()
+
+    async def _resolve(self, host: str, timeout: float | None) -> List[str]:
+        return await cache.resolve(host, timeout)
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host):
+            return await self._inner.connect_tcp(host, port, timeout, local_address, socket_options)
+        t0 = time.perf_counter()
+        addrs = await self._resolve(host, timeout)
+        sink = current_dns_ms.get()
+        if sink is not None:
+            sink.append((time.perf_counter() - t0) * 1000)
+        err: Exception | None = None
+        for addr in addrs:  # first address that accepts the connection
+            try:
+                return await self._inner.connect_tcp(addr, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                err = e
+        raise err
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._inner.sleep(seconds)
+
+
+class TimingBackend(CachingBackend):
+    """
+    Same, but every connection does its own lookup: for cold probes, which
+    should pay for DNS like a first-time visitor while still reporting it
+    as dns_ms rather than as part of the connect time.
+    """
+
+    async def _resolve(self, host: str, timeout: float | None) -> List[str]:
+        return await cache.resolve_uncached(host, timeout)
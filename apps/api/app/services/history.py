@@ -0,0 +1,279 @@
+# apps/api/app/services/history.py
+"""
+Daily uptime history for the status pages' bars (one bar per UTC day).
+
+`uptime_days` holds one small row per monitor and day: ok/fail counts and
+the day's outages, run-length encoded as a flat int[] of (start, length)
+pairs in seconds since midnight. An outage runs from the first failed check
+to the first ok check after it; `last_sec` / `last_ok` remember where the
+day left off, so an outage still open at the end of one batch is extended
+by the next. Spans are clipped to their day: an outage that runs over
+midnight is the last span of one day (shown running to midnight once the
+day is over) and a span starting at second 0 of the next, so a span at 0
+means "still down from the day before".
+
+The check writer calls `record_batch` in the same transaction as the COPY
+(like the rollups), so history never drifts from the raw rows. A 90-day
+history is one index range scan over at most 90 of these rows, however
+often the monitor is checked and however old it is.
+
+Backfill / repair (rebuilds whole days from raw checks, overwriting them):
+
+    python -m app.services.history --since 2025-08-01 [--until 2025-09-01] [--monitor ID]
+"""
+import argparse, asyncio
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..db import async_engine
+
+if TYPE_CHECKING:
+    from .ingest import CheckRow
+
+DAY = timedelta(days=1)
+
+
+def _fold(spans: List[int], last_sec: int | None, last_ok: bool | None,
+          checks: Iterable[Tuple[int, bool]]) -> Tuple[List[int], int | None, bool | None]:
+    """Fold (second of day, ok) checks, in time order, into a day's outage spans."""
+    spans = list(spans)
+    for t, ok in checks:
+        if last_sec is not None and t < last_sec:
+            continue  # late row (e.g. from a node that just handed the group over): counted, but no span
+        if last_ok is False and spans:
+            spans[-1] = t - spans[-2]  # extend the open outage; an ok check closes it right here
+        elif not ok:
+            spans += [t, 0]
+        last_sec, last_ok = t, ok
+    return spans, last_sec, last_ok
+
+
+# state a day starts from when the day before ended down: an outage open since midnight
+_CARRIED = ([0, 0], 0, False)
+
+
+def _second_of_day(t: datetime) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _int_array(xs: List[int]) -> str:
+    # per-row int[] in an unnest() batch: ragged arrays can't be a 2-D parameter
+    return "{" + ",".join(map(str, xs)) + "}"
+
+
+_UPSERT = """
+insert into uptime_days as u (monitor_id, day, ok_n, fail_n)
+select * from unnest(cast(:mid as text[]), cast(:day as date[]), cast(:ok_n as int[]), cast(:fail_n as int[]))
+on conflict (monitor_id, day) do update set
+    ok_n = u.ok_n + excluded.ok_n,
+    fail_n = u.fail_n + excluded.fail_n
+returning monitor_id, day, down_spans, last_sec, last_ok
+"""
+
+# spans can't be folded in SQL: read back the old ones (the row is already
+# locked by the upsert above), fold in Python, write the result
+_SET_SPANS = """
+update uptime_days as u set down_spans = cast(v.spans as int[]), last_sec = v.last_sec, last_ok = v.last_ok
+from unnest(
+    cast(:mid as text[]), cast(:day as date[]), cast(:spans as text[]), cast(:last_sec as int[]), cast(:last_ok as boolean[])
+) as v(monitor_id, day, spans, last_sec, last_ok)
+where u.monitor_id = v.monitor_id and u.day = v.day
+"""
+
+
+async def record_batch(conn: AsyncConnection, batch: Iterable["CheckRow"]):
+    """Fold a batch of new checks into uptime_days (two statements)."""
+    acc: Dict[Tuple[str, date], list] = defaultdict(lambda: [0, 0, []])  # ok_n, fail_n, [(second, ok)]
+    for r in sorted(batch, key=lambda r: r.ts):
+        t = r.ts.astimezone(timezone.utc)
+        a = acc[(r.monitor_id, t.date())]
+        a[0 if r.ok else 1] += 1
+        a[2].append((_second_of_day(t), r.ok))
+    keys = sorted(acc)  # stable lock order across concurrent writers
+    res = await conn.execute(
+        text(_UPSERT),
+        {
+            "mid": [k[0] for k in keys],
+            "day": [k[1] for k in keys],
+            "ok_n": [acc[k][0] for k in keys],
+            "fail_n": [acc[k][1] for k in keys],
+        },
+    )
+    rows = sorted(res.all(), key=lambda r: (r[0], r[1]))
+    # days this batch starts: carry an outage over from a day that ended down
+    down_before = await _ended_down(conn, [(mid, day - DAY) for mid, day, _, last_sec, _ in rows
+                                           if last_sec is None and (mid, day - DAY) not in acc])
+    folded, state = [], {}
+    for mid, day, spans, last_sec, last_ok in rows:
+        if last_sec is None:
+            prev = state.get((mid, day - DAY))
+            if (prev[2] is False) if prev is not None else (mid, day - DAY) in down_before:
+                spans, last_sec, last_ok = _CARRIED
+        state[(mid, day)] = _fold(spans, last_sec, last_ok, acc[(mid, day)][2])
+        folded.append((mid, day, *state[(mid, day)]))
+    await conn.execute(
+        text(_SET_SPANS),
+        {
+            "mid": [f[0] for f in folded],
+            "day": [f[1] for f in folded],
+            "spans": [_int_array(f[2]) for f in folded],
+            "last_sec": [f[3] for f in folded],
+            "last_ok": [f[4] for f in folded],
+        },
+    )
+
+
+async def _ended_down(conn: AsyncConnection, keys: List[Tuple[str, date]]) -> set:
+    if not keys:
+        return set()
+    res = await conn.execute(
+        text(
+            """
+            select u.monitor_id, u.day from uptime_days u
+            join unnest(cast(:mid as text[]), cast(:day as date[])) as k(monitor_id, day)
+              on u.monitor_id = k.monitor_id and u.day = k.day
+            where u.last_ok = false
+            """
+        ),
+        {"mid": [k[0] for k in keys], "day": [k[1] for k in keys]},
+    )
+    return {(mid, day) for mid, day in res.all()}
+
+
+_HISTORY = """
+select m.id, d.day, d.ok_n, d.fail_n, d.down_spans, d.last_ok
+from monitors m
+left join uptime_days d on d.monitor_id = m.id and d.day >= :since
+where m.slug = :slug
+order by d.day
+"""
+
+
+async def status_history(db: AsyncSession, slug: str, days: int) -> List[dict] | None:
+    """The last `days` UTC days (oldest first, today included) of a status page; None if there's no such page."""
+    today = datetime.now(timezone.utc).date()
+    since = today - (days - 1) * DAY
+    rows = (await db.execute(text(_HISTORY), {"slug": slug, "since": since})).all()
+    if not rows:
+        return None
+    by_day = {r.day: r for r in rows if r.day is not None}
+
+    bars = []
+    for i in range(days):
+        d = since + i * DAY
+        r = by_day.get(d)
+        ok_n, fail_n, spans = (r.ok_n, r.fail_n, list(r.down_spans)) if r else (0, 0, [])
+        if r and r.last_ok is False and spans and d < today:
+            spans[-1] = 86400 - spans[-2]  # still down when the day ended
+        n = ok_n + fail_n
+        midnight = datetime.combine(d, time(), timezone.utc)
+        outages = [
+            {"start": midnight + timedelta(seconds=spans[j]), "duration_sec": spans[j + 1]}
+            for j in range(0, len(spans), 2)
+        ]
+        bars.append({
+            "day": d,
+            "checks": n,
+            "uptime_pct": round(ok_n / n * 100.0, 3) if n else None,
+            "downtime_sec": sum(o["duration_sec"] for o in outages),
+            "outages": outages,
+        })
+    return bars
+
+
+_REPAIR = """
+select monitor_id, (ts at time zone 'UTC')::date as day,
+       array_agg(extract(epoch from ts - date_trunc('day', ts, 'UTC'))::int order by ts),
+       array_agg(ok order by ts)
+from checks
+where ts >= :a and ts < :b {monitor_filter}
+group by 1, 2
+"""
+
+_DOWN_AT_END = """
+select monitor_id from uptime_days where day = :d and last_ok = false {monitor_filter}
+"""
+
+_OVERWRITE = """
+insert into uptime_days (monitor_id, day, ok_n, fail_n, down_spans, last_sec, last_ok)
+select monitor_id, day, ok_n, fail_n, cast(spans as int[]), last_sec, last_ok from unnest(
+    cast(:mid as text[]), cast(:day as date[]), cast(:ok_n as int[]), cast(:fail_n as int[]),
+    cast(:spans as text[]), cast(:last_sec as int[]), cast(:last_ok as boolean[])
+) as v(monitor_id, day, ok_n, fail_n, spans, last_sec, last_ok)
+on conflict (monitor_id, day) do update set
+    ok_n = excluded.ok_n, fail_n = excluded.fail_n, down_spans = excluded.down_spans,
+    last_sec = excluded.last_sec, last_ok = excluded.last_ok
+"""
+
+
+async def _overwrite(conn: AsyncConnection, rows: List[tuple]):
+    await conn.execute(
+        text(_OVERWRITE),
+        {
+            "mid": [r[0] for r in rows],
+            "day": [r[1] for r in rows],
+            "ok_n": [r[2] for r in rows],
+            "fail_n": [r[3] for r in rows],
+            "spans": [_int_array(r[4]) for r in rows],
+            "last_sec": [r[5] for r in rows],
+            "last_ok": [r[6] for r in rows],
+        },
+    )
+
+
+async def backfill(since: date, until: date, monitor_id: str | None = None):
+    """
+    Rebuild uptime_days for the UTC days [since, until) from raw checks, one
+    day per transaction. Days with raw rows are overwritten; days whose raw
+    rows are gone (e.g. dropped by retention) are left alone.
+    """
+    params = {"mid": monitor_id} if monitor_id else {}
+    monitor_filter = "and monitor_id = :mid" if monitor_id else ""
+    async with async_engine.connect() as conn:
+        res = await conn.execute(text(_DOWN_AT_END.format(monitor_filter=monitor_filter)), {"d": since - DAY, **params})
+        down = {mid for (mid,) in res}
+    d = since
+    while d < until:
+        a = datetime.combine(d, time(), timezone.utc)
+        async with async_engine.begin() as conn:
+            res = await conn.stream(text(_REPAIR.format(monitor_filter=monitor_filter)), {"a": a, "b": a + DAY, **params})
+            pending, ended_down = [], set()
+            async for mid, day, secs, oks in res:
+                ok_n = sum(oks)
+                folded = _fold(*(_CARRIED if mid in down else ([], None, None)), zip(secs, oks))
+                if folded[2] is False:
+                    ended_down.add(mid)
+                pending.append((mid, day, ok_n, len(oks) - ok_n, *folded))
+                if len(pending) >= 1000:
+                    await _overwrite(conn, pending)
+                    pending = []
+            if pending:
+                await _overwrite(conn, pending)
+        down = ended_down
+        print(f"history repaired {d.isoformat()}")
+        d += DAY
+
+
+def main():
+    p = argparse.ArgumentParser(description="Backfill / repair daily uptime history from raw checks")
+    p.add_argument("--since", required=True, type=date.fromisoformat)
+    # default stops at today, which the live writer is still filling
+    p.add_argument("--until", type=date.fromisoformat, default=datetime.now(timezone.utc).date())
+    p.add_argument("--monitor", default=None)
+    args = p.parse_args()
+
+    async def run():
+        try:
+            await backfill(args.since, args.until, args.monitor)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# apps/api/app/services/incidents.py
+import logging, time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import async_engine
+from .ingest import CheckRow
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _State:
+    up: bool = True
+    streak: int = 0                    # consecutive results disagreeing with `up`
+    streak_start: datetime | None = None
+    open_id: int | None = None         # incidents.id while down
+    seen: float = 0.0                  # monotonic time of the last result
+
+
+def _reason(r: CheckRow) -> str:
+    return f"HTTP {r.status_code}" if r.status_code else "no response (timeout or connection error)"
+
+
+class IncidentEngine:
+    """
+    Per-monitor up/down state machine fed with every probe result.
+
+    A monitor goes down after `fail_threshold` consecutive failures and back
+    up after `recover_threshold` consecutive successes; only those two
+    transitions touch the DB (insert / resolve an `incidents` row), so
+    incident history grows with the number of outages rather than checks.
+
+    State lives in memory on the node probing the monitor. It is (re)loaded
+    from the open incidents the first time a monitor is seen, and again if
+    it hasn't been seen for a couple of intervals (its group was probed by
+    another node meanwhile). A partial unique index keeps at most one open
+    incident per monitor even if two nodes briefly overlap.
+    """
+
+    def __init__(
+        self,
+        fail_threshold: int = settings.INCIDENT_FAIL_THRESHOLD,
+        recover_threshold: int = settings.INCIDENT_RECOVER_THRESHOLD,
+    ):
+        self.fail_threshold = max(1, fail_threshold)
+        self.recover_threshold = max(1, recover_threshold)
+        self._states: Dict[str, _State] = {}
+
+    def forget(self, monitor_id: str):
+        self._states.pop(monitor_id, None)
+
+    async def _load(self, monitor_ids: List[str]):
+        async with async_engine.connect() as conn:
+            rows = (await conn.execute(
+                text("select monitor_id, id from incidents where monitor_id = any(:ids) and resolved_at is null"),
+                {"ids": monitor_ids},
+            )).all()
+        open_ids = dict(rows)
+        for mid in monitor_ids:
+            oid = open_ids.get(mid)
+            self._states[mid] = _State(up=oid is None, open_id=oid)
+
+    async def observe(self, rows: List[CheckRow], interval_sec: int):
+        """Feed one group's results (one row per monitor)."""
+        now = time.monotonic()
+        stale = [r.monitor_id for r in rows
+                 if (s := self._states.get(r.monitor_id)) is None or now - s.seen > 2 * interval_sec]
+        if stale:
+            await self._load(stale)
+
+        for r in rows:
+            s = self._states[r.monitor_id]
+            s.seen = now
+            if r.ok == s.up:
+                s.streak, s.streak_start = 0, None
+                continue
+            if s.streak == 0:
+                s.streak_start = r.ts
+            s.streak += 1
+            if s.up and s.streak >= self.fail_threshold:
+                await self._open(r, s)
+            elif not s.up and s.streak >= self.recover_threshold:
+                await self._resolve(r, s)
+
+    async def _open(self, r: CheckRow, s: _State):
+        try:
+            async with async_engine.begin() as conn:
+                oid = (await conn.execute(
+                    text(
+                        "insert into incidents (monitor_id, opened_at, reason, last_status_code) "
+                        "values (:mid, :at, :reason, :code) "
+                        "on conflict (monitor_id) where resolved_at is null do nothing returning id"
+                    ),
+                    {"mid": r.monitor_id, "at": s.streak_start, "reason": _reason(r), "code": r.status_code or None},
+                )).scalar()
+                if oid is None:
+                    # someone else (another node) already has it open
+                    oid = (await conn.execute(
+                        text("select id from incidents where monitor_id = :mid and resolved_at is null"),
+                        {"mid": r.monitor_id},
+                    )).scalar()
+        except Exception:
+            # e.g. the monitor was just deleted; try again on the next result
+            log.exception("failed to open incident for %s", r.monitor_id)
+            return
+        s.up, s.streak, s.streak_start, s.open_id = False, 0, None, oid
+
+    async def _resolve(self, r: CheckRow, s: _State):
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "update incidents set resolved_at = :at "
+                        "where monitor_id = :mid and resolved_at is null"
+                    ),
+                    {"mid": r.monitor_id, "at": s.streak_start},
+                )
+        except Exception:
+            log.exception("failed to resolve incident for %s", r.monitor_id)
+            return
+        s.up, s.streak, s.streak_start, s.open_id = True, 0, None, None
+
+
+incident_engine = IncidentEngine()
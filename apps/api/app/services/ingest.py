@@ -0,0 +1,164 @@
+# apps/api/app/services/ingest.py
+import asyncio, logging, time
+from datetime import datetime
+from typing import List, NamedTuple
+
+from psycopg.errors import ForeignKeyViolation
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import async_engine
+from . import history, metrics, rollups
+
+log = logging.getLogger(__name__)
+
+
+class CheckRow(NamedTuple):
+    monitor_id: str
+    status_code: int
+    ok: bool
+    latency_ms: int
+    ts: datetime
+    # request phases (see probe_client.ProbeResult)
+    dns_ms: int | None = None
+    connect_ms: int | None = None
+    tls_ms: int | None = None
+    ttfb_ms: int | None = None
+    reused: bool | None = None
+
+
+# column order for COPY; must match CheckRow
+COLUMNS = CheckRow._fields
+
+_STOP = None  # queue sentinel used by CheckWriter.stop()
+
+
+class CheckWriter:
+    """
+    Buffers probe results in memory and writes them to `checks` in bulk.
+
+    A batch is flushed when it reaches `batch_size` rows or when the oldest
+    row has waited `flush_interval` seconds, whichever comes first. The queue
+    is bounded: once `max_pending` rows are waiting, `submit` blocks, which
+    slows the probes down instead of growing memory without limit.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        flush_interval: float = settings.INGEST_FLUSH_INTERVAL_SEC,
+        max_pending: int = settings.INGEST_QUEUE_MAX,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[CheckRow | None] = asyncio.Queue(maxsize=max_pending)
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def submit(self, rows: List[CheckRow]):
+        for r in rows:
+            await self._queue.put(r)  # backpressure when the buffer is full
+
+    async def _next_batch(self) -> List[CheckRow | None]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            # grab whatever is already queued without waiting
+            while len(batch) < self.batch_size and batch[-1] is not _STOP and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.batch_size or batch[-1] is _STOP or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                try:
+                    await self._flush(batch)
+                except Exception:
+                    # never let one batch stop the writer: probes would block in submit() for good
+                    log.exception("check writer: dropping a batch of %d rows", len(batch))
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[CheckRow]):
+        orphans = False
+        for attempt in range(3):
+            try:
+                if orphans:
+                    # a monitor was deleted while its checks were buffered; drop just those rows
+                    batch = await _drop_orphans(batch)
+                    orphans = False
+                    if not batch:
+                        return
+                await _write_batch(batch)
+                return
+            except ForeignKeyViolation:
+                orphans = True
+            except Exception:
+                log.exception("check flush failed (attempt %d, %d rows)", attempt + 1, len(batch))
+                await asyncio.sleep(0.5 * (attempt + 1))
+        log.error("dropping %d check rows after repeated flush failures", len(batch))
+
+    async def stop(self):
+        """Flush everything still buffered, then stop the background loop."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)  # queued behind the pending rows
+        await self._task
+        self._task = None
+
+
+async def _write_batch(batch: List[CheckRow]):
+    t0 = time.perf_counter()
+    async with async_engine.begin() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection  # psycopg AsyncConnection, same transaction
+        async with pg.cursor() as cur:
+            async with cur.copy(f"COPY checks ({', '.join(COLUMNS)}) FROM STDIN") as cp:
+                for r in batch:
+                    await cp.write_row(r)
+        await rollups.record_batch(conn, batch)
+        await history.record_batch(conn, batch)
+    metrics.DB_WRITE.observe(time.perf_counter() - t0)
+    metrics.DB_WRITE_ROWS.inc(len(batch))
+
+
+async def _drop_orphans(batch: List[CheckRow]) -> List[CheckRow]:
+    async with async_engine.connect() as conn:
+        live = set((await conn.execute(
+            text("select id from monitors where id = any(:ids)"),
+            {"ids": list({r.monitor_id for r in batch})},
+        )).scalars())
+    return [r for r in batch if r.monitor_id in live]
+
+
+writer: CheckWriter | None = None
+
+
+def start_writer() -> CheckWriter:
+    global writer
+    if writer is None:
+        writer = CheckWriter()
+    writer.start()
+    return writer
+
+
+async def stop_writer():
+    global writer
+    if writer is not None:
+        w, writer = writer, None
+        await w.stop()
@@ -0,0 +1,136 @@
+# apps/api/app/services/latest.py
+import logging, time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..db import async_engine
+
+if TYPE_CHECKING:
+    from .ingest import CheckRow
+
+log = logging.getLogger(__name__)
+
+_MISS = object()
+
+
+class LatestCache:
+    """
+    Bounded LRU of monitor_id -> latest check ({status_code, ok, latency_ms, ts}).
+
+    An entry stays fresh until the monitor's next check is due (ts + interval,
+    plus a little grace for the write path). On the node that probes the
+    monitor, ping_group overwrites the entry before that happens; on any other
+    node (another shard, or an API-only process) the entry simply expires and
+    the next read goes back to the DB once. That keeps every process correct
+    without cross-node invalidation, while a status page costs at most one
+    `checks` lookup per monitor per interval.
+    """
+
+    def __init__(self, max_entries: int = settings.LATEST_CACHE_MAX):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[dict | None, float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, monitor_id: str):
+        item = self._data.get(monitor_id)
+        if item is None or item[1] < time.time():
+            return _MISS
+        self._data.move_to_end(monitor_id)
+        return item[0]
+
+    def put(self, monitor_id: str, last: dict | None, interval_sec: int):
+        due = last["ts"].timestamp() + interval_sec if last else 0.0
+        fresh_until = max(due + settings.LATEST_CACHE_GRACE_SEC, time.time() + settings.LATEST_CACHE_MIN_TTL_SEC)
+        cur = self._data.get(monitor_id)
+        if cur is not None and cur[0] and last and cur[0]["ts"] > last["ts"]:
+            return  # never replace with an older result
+        self._data[monitor_id] = (last, fresh_until)
+        self._data.move_to_end(monitor_id)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def record(self, rows: Iterable["CheckRow"], interval_sec: int):
+        for r in rows:
+            self.put(
+                r.monitor_id,
+                {"status_code": r.status_code, "ok": r.ok, "latency_ms": r.latency_ms, "ts": r.ts},
+                interval_sec,
+            )
+
+    def discard(self, monitor_id: str):
+        self._data.pop(monitor_id, None)
+
+
+cache = LatestCache()
+
+_LATEST_SQL = text(
+    "select status_code, ok, latency_ms, ts "
+    "from checks where monitor_id=:mid order by ts desc limit 1"
+)
+
+
+async def get_latest(db: AsyncSession, monitor_id: str, interval_sec: int) -> dict | None:
+    """Latest check for a monitor; cache first, one indexed lookup on a miss."""
+    hit = cache.get(monitor_id)
+    if hit is not _MISS:
+        return hit
+    row = (await db.execute(_LATEST_SQL, {"mid": monitor_id})).mappings().first()
+    last = dict(row) if row else None
+    cache.put(monitor_id, last, interval_sec)
+    return last
+
+
+async def get_latest_many(db: AsyncSession, monitors: Iterable[Tuple[str, int]]) -> Dict[str, dict | None]:
+    """get_latest for many (monitor_id, interval_sec) at once; all misses share one query."""
+    out, misses = {}, {}
+    for mid, interval in monitors:
+        hit = cache.get(mid)
+        if hit is _MISS:
+            misses[mid] = interval
+        else:
+            out[mid] = hit
+    if misses:
+        # one index probe per monitor (lateral), rather than a distinct-on over all their checks
+        rows = (await db.execute(text(
+            """
+            select m.id as monitor_id, c.status_code, c.ok, c.latency_ms, c.ts
+            from unnest(cast(:ids as text[])) as m(id)
+            join lateral (
+                select status_code, ok, latency_ms, ts from checks
+                where monitor_id = m.id order by ts desc limit 1
+            ) c on true
+            """
+        ), {"ids": list(misses)})).mappings().all()
+        found = {r["monitor_id"]: {k: r[k] for k in ("status_code", "ok", "latency_ms", "ts")} for r in rows}
+        for mid, interval in misses.items():
+            out[mid] = found.get(mid)
+            cache.put(mid, out[mid], interval)
+    return out
+
+
+async def warm():
+    """Fill the cache from one query over the recent partitions."""
+    t0 = time.perf_counter()
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(text(
+            """
+            select distinct on (c.monitor_id)
+                   c.monitor_id, c.status_code, c.ok, c.latency_ms, c.ts, m.interval_sec
+            from checks c join monitors m on m.id = c.monitor_id
+            where c.ts >= now() - make_interval(secs => :window)
+            order by c.monitor_id, c.ts desc
+            """
+        ), {"window": settings.LATEST_CACHE_WARM_WINDOW_SEC})).mappings().all()
+    for r in rows[: cache.max_entries]:
+        cache.put(
+            r["monitor_id"],
+            {"status_code": r["status_code"], "ok": r["ok"], "latency_ms": r["latency_ms"], "ts": r["ts"]},
+            r["interval_sec"],
+        )
+    log.info("latest-status cache warmed with %d monitors in %.0f ms", len(rows), (time.perf_counter() - t0) * 1000)
@@ -0,0 +1,261 @@
+# apps/api/app/services/metrics.py
+"""
+Minimal Prometheus instrumentation (text exposition format 0.0.4), no
+client library needed.
+
+Every hot-path observation happens on the event loop thread (probes, the
+wheel, the check writer, the ASGI middleware), so an observation is just a
+couple of dict/list updates with no locking. Label sets are looked up once
+(`.labels(...)`) and can be cached by the caller. Gauges that mirror
+existing state (pool usage, wheel size) are read when /metrics is scraped.
+"""
+import bisect, math, time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# seconds; covers sub-ms DB/route timings up to the probe timeout
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new()
+        return child
+
+    def _default(self):
+        return self.labels(*())
+
+    @abstractmethod
+    def _new(self):
+        """A fresh child (value holder) for one label set."""
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        """Exposition lines for one label set."""
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            out.extend(self._render_child(values, child))
+        return out
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterValue()
+
+    def inc(self, n: float = 1.0):
+        self._default().inc(n)
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value per label set."""
+        return {k: child.value for k, child in self._children.items()}
+
+    def total(self) -> float:
+        """Sum over all label sets."""
+        return sum(child.value for child in self._children.values())
+
+    def _render_child(self, values, child):
+        return [f"{self.name}_total{_labels(self.labelnames, values)} {_fmt(child.value)}"]
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, n: float = 1.0):
+        self.value -= n
+
+    def set(self, v: float):
+        self.value = v
+
+
+class Gauge(_Metric):
+    """
+    Settable gauge, or `fn` evaluated at scrape time. For a labelled gauge
+    `fn` returns {label values tuple: value}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Callable[[], float] | None = None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def _new(self):
+        return _GaugeValue()
+
+    def inc(self, n: float = 1.0):
+        self._default().inc(n)
+
+    def dec(self, n: float = 1.0):
+        self._default().dec(n)
+
+    def set(self, v: float):
+        self._default().set(v)
+
+    def render(self) -> List[str]:
+        if self.fn is not None:
+            try:
+                v = self.fn()
+                for values, x in (v.items() if isinstance(v, dict) else [((), v)]):
+                    self.labels(*values).set(x)
+            except Exception:
+                pass  # keep the last value
+        return super().render()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_fmt(child.value)}"]
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, v: float):
+        self._default().observe(v)
+
+    def totals(self) -> Tuple[int, float]:
+        """(count, sum) of observations over all label sets."""
+        children = list(self._children.values())
+        return sum(c.count for c in children), sum(c.sum for c in children)
+
+    def _render_child(self, values, child):
+        out, acc = [], 0
+        for bound, c in zip(self.buckets + (math.inf,), child.counts):
+            acc += c
+            le = 'le="' + _fmt(bound) + '"'
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {acc}")
+        out.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_fmt(child.sum)}")
+        out.append(f"{self.name}_count{_labels(self.labelnames, values)} {child.count}")
+        return out
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---- the metrics themselves ----
+
+PROBE_LATENCY = Histogram("uptime_probe_latency_seconds", "HTTP probe latency (responses only)")
+PROBE_RESULTS = Counter(
+    "uptime_probe_results",
+    "HTTP probes by outcome (one per request, however many monitors share it; "
+    "ok = the status matched every monitor's expected status)",
+    ["outcome"],
+)
+# pre-resolved children; outcome is one of these
+PROBE_OK = PROBE_RESULTS.labels("ok")
+PROBE_STATUS_MISMATCH = PROBE_RESULTS.labels("status_mismatch")
+PROBE_TIMEOUT = PROBE_RESULTS.labels("timeout")
+PROBE_CONNECT_ERROR = PROBE_RESULTS.labels("connection_error")
+CHECK_RESULTS = Counter("uptime_check_results", "Check rows recorded (one per monitor per probe)", ["ok"])
+CHECK_OK, CHECK_FAILED = CHECK_RESULTS.labels("true"), CHECK_RESULTS.labels("false")
+PROBES_IN_FLIGHT = Gauge("uptime_probes_in_flight", "Probes currently waiting on the network")
+PROBE_ADMISSION_DELAYED = Counter(
+    "uptime_probe_admission_delayed", "Probes that had to queue for a global or per-host slot"
+)
+PROBE_ADMISSION_SKIPPED = Counter(
+    "uptime_probe_admission_skipped", "Probes dropped because no slot freed up before their deadline"
+)
+PROBE_ADMISSION_WAIT = Histogram(
+    "uptime_probe_admission_wait_seconds", "Time queued probes waited for a slot",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+SCHEDULER_LAG = Histogram(
+    "uptime_scheduler_start_lag_seconds", "How long after its phase slot a group's probe started",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+SCHEDULER_SKIPPED = Counter("uptime_scheduler_skipped_runs", "Runs not started because the previous one was still going")
+SCHEDULER_JOB_FAILURES = Counter("uptime_scheduler_job_failures", "Scheduled jobs that raised")
+
+DB_WRITE = Histogram("uptime_db_write_seconds", "Check batch write (COPY + rollups + commit)")
+DB_WRITE_ROWS = Counter("uptime_db_written_rows", "Check rows written")
+
+HTTP_LATENCY = Histogram("uptime_http_request_seconds", "API handler latency", ["method", "route"])
+
+
+class MetricsMiddleware:
+    """Per-route handler latency, labelled with the route template (not the raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_LATENCY.labels(scope["method"], path).observe(time.perf_counter() - t0)
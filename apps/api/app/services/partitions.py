@@ -0,0 +1,168 @@
+# apps/api/app/services/partitions.py
+"""
+Maintenance for the day-partitioned `checks` table.
+
+- creates tomorrow's (and the next PARTITION_PREMAKE_DAYS') partitions ahead of time
+- moves any rows that landed in checks_default into their day partition
+- drops whole day partitions older than CHECKS_RETENTION_DAYS
+
+Raw checks are only needed for the recent past: older data already lives on,
+downsampled, in the minute/hour rollups (services/rollups.py), which the
+check writer maintains in the same transaction as the raw insert. So
+expiring raw data is a cheap DROP TABLE rather than a huge DELETE. Minute
+rollups are pruned after ROLLUP_MINUTE_RETENTION_DAYS, hour rollups after
+ROLLUP_HOUR_RETENTION_DAYS and daily history (services/history.py) after
+HISTORY_RETENTION_DAYS.
+
+Runs hourly inside the scheduler (one node at a time, via an advisory lock),
+or by hand:
+
+    python -m app.services.partitions
+"""
+import asyncio, logging, re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..config import settings
+from ..db import async_engine
+
+log = logging.getLogger(__name__)
+
+PARTITION_RE = re.compile(r"^checks_p(\d{8})$")
+# arbitrary constant; pg_try_advisory_lock key for "maintenance is running"
+LOCK_KEY = 0x75707431
+
+
+def partition_name(d: date) -> str:
+    return f"checks_p{d:%Y%m%d}"
+
+
+def _bounds(d: date) -> tuple[str, str]:
+    a = datetime.combine(d, time(0), tzinfo=timezone.utc)
+    return a.isoformat(), (a + timedelta(days=1)).isoformat()
+
+
+async def existing_partitions(conn: AsyncConnection) -> Dict[date, str]:
+    names = (await conn.execute(text(
+        "select c.relname from pg_inherits i join pg_class c on c.oid = i.inhrelid "
+        "where i.inhparent = 'checks'::regclass"
+    ))).scalars()
+    out = {}
+    for n in names:
+        m = PARTITION_RE.match(n)
+        if m:
+            out[datetime.strptime(m.group(1), "%Y%m%d").date()] = n
+    return out
+
+
+async def ensure_partition(conn: AsyncConnection, d: date):
+    """
+    Create the partition for day `d`. Built standalone and then attached so
+    that any rows already sitting in checks_default for that day can be
+    moved over first (attaching would fail otherwise).
+    """
+    name = partition_name(d)
+    a, b = _bounds(d)
+    await conn.execute(text(f"create table {name} (like checks including defaults)"))
+    await conn.execute(text(
+        f"with moved as (delete from checks_default where ts >= '{a}' and ts < '{b}' returning *) "
+        f"insert into {name} select * from moved"
+    ))
+    await conn.execute(text(f"alter table checks attach partition {name} for values from ('{a}') to ('{b}')"))
+
+
+async def _prune(conn: AsyncConnection, table: str, column: str, cutoff, step: timedelta) -> int:
+    """Delete rows older than `cutoff`, oldest first, one `step`-wide range per transaction."""
+    lo = (await conn.execute(text(f"select min({column}) from {table}"))).scalar()
+    await conn.commit()
+    deleted = 0
+    while lo is not None and lo < cutoff:
+        hi = min(lo + step, cutoff)
+        res = await conn.execute(text(f"delete from {table} where {column} >= :lo and {column} < :hi"), {"lo": lo, "hi": hi})
+        await conn.commit()
+        deleted += res.rowcount
+        lo = hi
+    return deleted
+
+
+async def run_maintenance(today: date | None = None) -> dict:
+    today = today or datetime.now(timezone.utc).date()
+    now = datetime.now(timezone.utc)
+    created, dropped = [], []
+    # each step commits on its own: DDL on a partition locks the whole `checks`
+    # parent, so COPY ingest must only wait for the short partition step, not
+    # for the prune DELETEs too. The session-level advisory lock spans them all.
+    async with async_engine.connect() as conn:
+        got = (await conn.execute(text("select pg_try_advisory_lock(:k)"), {"k": LOCK_KEY})).scalar()
+        await conn.commit()
+        if not got:
+            return {"skipped": "another node is running maintenance"}
+        try:
+            async with conn.begin():
+                await conn.execute(text("create table if not exists checks_default partition of checks default"))
+                parts = await existing_partitions(conn)
+
+                # days that have rows stuck in the default partition get a real partition too
+                stray = (await conn.execute(text(
+                    "select distinct (ts at time zone 'UTC')::date from checks_default"
+                ))).scalars().all()
+                horizon = {today + timedelta(days=i) for i in range(settings.PARTITION_PREMAKE_DAYS + 1)}
+                cutoff = today - timedelta(days=settings.CHECKS_RETENTION_DAYS)
+                for d in sorted(horizon | set(stray)):
+                    if d not in parts and d >= cutoff:
+                        await ensure_partition(conn, d)
+                        created.append(partition_name(d))
+
+                for d, name in sorted(parts.items()):
+                    if d < cutoff:
+                        await conn.execute(text(f"drop table {name}"))
+                        dropped.append(name)
+
+            # anything expired that was still stuck in default
+            async with conn.begin():
+                await conn.execute(text("delete from checks_default where ts < :c"), {"c": _bounds(cutoff)[0]})
+
+            pruned = {
+                "check_rollups_minute": await _prune(
+                    conn, "check_rollups_minute", "bucket",
+                    now - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS), timedelta(hours=1),
+                ),
+                "check_rollups_hour": await _prune(
+                    conn, "check_rollups_hour", "bucket",
+                    now - timedelta(days=settings.ROLLUP_HOUR_RETENTION_DAYS), timedelta(days=1),
+                ),
+                "uptime_days": await _prune(
+                    conn, "uptime_days", "day",
+                    today - timedelta(days=settings.HISTORY_RETENTION_DAYS), timedelta(days=1),
+                ),
+            }
+        finally:
+            await conn.rollback()  # in case a step failed mid-transaction
+            await conn.execute(text("select pg_advisory_unlock(:k)"), {"k": LOCK_KEY})
+            await conn.commit()
+
+    if created or dropped:
+        log.info("checks partitions: created %s, dropped %s", created, dropped)
+    return {"created": created, "dropped": dropped, "pruned": pruned}
+
+
+async def maintenance_loop():
+    while True:
+        try:
+            await run_maintenance()
+        except Exception:
+            log.exception("partition maintenance failed")
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_SEC)
+
+
+if __name__ == "__main__":
+    async def _main():
+        try:
+            print(await run_maintenance())
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(_main())
@@ -0,0 +1,44 @@
+# apps/api/app/services/passwords.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import bcrypt
+
+from ..config import settings
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hash/verify calls already queued; the caller should back off."""
+
+
+class PasswordPool:
+    """
+    bcrypt on its own small thread pool, so a login burst can only ever tie
+    up BCRYPT_WORKERS threads (bcrypt releases the GIL) instead of the shared
+    request threadpool. At most BCRYPT_QUEUE_MAX calls may be running or
+    waiting; beyond that calls fail fast with PasswordPoolBusy (-> 429)
+    rather than queueing for seconds.
+    """
+
+    def __init__(self, workers: int = settings.BCRYPT_WORKERS, max_pending: int = settings.BCRYPT_QUEUE_MAX):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0  # only touched on the event loop
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordPoolBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(bcrypt.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(bcrypt.verify, password, password_hash)
+
+
+pool = PasswordPool()
@@ -0,0 +1,258 @@
+# apps/api/app/services/probe_client.py
+import asyncio, logging, time, weakref
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpcore, httpx
+
+from ..config import settings
+from . import metrics
+from .dns_cache import CachingBackend, TimingBackend, current_dns_ms
+
+log = logging.getLogger(__name__)
+
+# Monitor.probe_mode values, least to most demanding (a group probes with the
+# most demanding mode among its monitors):
+#   head    - HEAD request
+#   headers - GET, stop once the response headers are in (bodies up to
+#             PROBE_DRAIN_MAX_BYTES are drained so the keep-alive connection
+#             can be reused)
+#   body    - GET and read the body, at most PROBE_MAX_BODY_BYTES of it
+PROBE_MODES = ("head", "headers", "body")
+DEFAULT_PROBE_MODE = "headers"
+
+
+def group_mode(modes) -> str:
+    return max(modes, key=PROBE_MODES.index, default=DEFAULT_PROBE_MODE)
+
+
+@dataclass
+class ProbeResult:
+    status_code: int | None
+    latency_ms: int | None
+    error: str | None = None   # "timeout" / "connection_error" when there was no response
+    # phases of the (last) request; None when the phase didn't happen, e.g. no
+    # DNS/connect/TLS on a reused keep-alive connection
+    dns_ms: int | None = None
+    connect_ms: int | None = None
+    tls_ms: int | None = None
+    ttfb_ms: int | None = None
+    reused: bool | None = None
+
+
+def _ms(v: float | None) -> int | None:
+    return None if v is None else int(round(v))
+
+
+class _Phases:
+    """
+    Collects one probe's timings from httpcore's trace extension events
+    ("connection.connect_tcp.started", "http11.receive_response_headers.complete", ...).
+    DNS is timed by the network backend (CachingBackend on the warm client,
+    TimingBackend on the cold one) inside connect_tcp, so it is subtracted
+    from the connect time. On redirects each hop overwrites the previous one.
+    """
+
+    def __init__(self):
+        self.dns: list[float] = []   # CachingBackend appends here (see current_dns_ms)
+        self.connect = self.tls = self.ttfb = None
+        self.reused: bool | None = None
+        self._new_conn = False
+        self._started: dict[str, float] = {}
+
+    async def trace(self, event: str, info: dict):
+        now = time.perf_counter()
+        step, _, stage = event.rpartition(".")
+        step = step.partition(".")[2]  # drop the "connection." / "http11." / "http2." prefix
+        if stage == "started":
+            self._started[step] = now
+            if step == "connect_tcp":
+                self.dns.clear()
+                self.connect = self.tls = None
+                self._new_conn = True
+            elif step == "send_request_headers":
+                self.reused = not self._new_conn
+                self._new_conn = False
+                self.ttfb = None
+            return
+        if stage != "complete":
+            return
+        t0 = self._started.get(step, now)
+        if step == "connect_tcp":
+            self.connect = (now - t0) * 1000 - sum(self.dns)
+        elif step == "start_tls":
+            self.tls = (now - t0) * 1000
+        elif step == "receive_response_headers":
+            # request sent -> response headers in: server think time + one round trip
+            self.ttfb = (now - self._started.get("send_request_headers", t0)) * 1000
+
+    def fields(self) -> dict:
+        fresh = self.reused is False
+        return {
+            "dns_ms": _ms(sum(self.dns)) if fresh and self.dns else None,
+            "connect_ms": _ms(self.connect) if fresh else None,
+            "tls_ms": _ms(self.tls) if fresh else None,
+            "ttfb_ms": _ms(self.ttfb),
+            "reused": self.reused,
+        }
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _transport(http2: bool, limits: httpx.Limits, backend: httpcore.AsyncNetworkBackend) -> httpx.AsyncHTTPTransport:
+    t = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    # httpx has no network-backend option: build the same pool with ours and
+    # hand it over. _pool is httpx-internal, so fail loudly if an upgrade
+    # changes it rather than silently probe without DNS caching/timing.
+    if not isinstance(getattr(t, "_pool", None), httpcore.AsyncConnectionPool):
+        raise RuntimeError("httpx.AsyncHTTPTransport._pool changed; update probe_client._transport")
+    t._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(),
+        max_connections=limits.max_connections,
+        max_keepalive_connections=limits.max_keepalive_connections,
+        keepalive_expiry=limits.keepalive_expiry,
+        http1=True,
+        http2=http2,
+        network_backend=backend,
+    )
+    return t
+
+
+class ProbeClient:
+    """
+    Long-lived HTTP client shared by every probe.
+
+    Warm probes go through one pooled AsyncClient so keep-alive connections
+    (and their TLS sessions) are reused across ticks, resolving through the
+    DNS cache (services/dns_cache.py). Cold probes use a second
+    client with keep-alive disabled, so every request pays for a new
+    DNS lookup + TCP connect + TLS handshake, like a first-time visitor would.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = settings.PROBE_TIMEOUT_SEC,
+        max_connections: int = settings.PROBE_MAX_CONNECTIONS,
+        max_per_host: int = settings.PROBE_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive: int = settings.PROBE_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.PROBE_KEEPALIVE_EXPIRY_SEC,
+        http2: bool = settings.PROBE_HTTP2,
+        max_body_bytes: int = settings.PROBE_MAX_BODY_BYTES,
+        drain_max_bytes: int = settings.PROBE_DRAIN_MAX_BYTES,
+    ):
+        if http2 and not _http2_available():
+            log.warning("PROBE_HTTP2 is set but the 'h2' package is missing; falling back to HTTP/1.1")
+            http2 = False
+
+        self.max_per_host = max_per_host
+        self.max_body_bytes = max_body_bytes
+        self.drain_max_bytes = drain_max_bytes
+        # only hosts with a probe in flight or waiting: whoever holds or waits on a
+        # semaphore keeps it alive, so idle hosts drop out on their own
+        self._hosts: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+        self._warm = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            transport=_transport(http2, httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ), CachingBackend() if settings.DNS_CACHE_ENABLED else TimingBackend()),
+        )
+        self._cold = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            # own lookup per connection, but still timed as dns_ms
+            transport=_transport(http2, httpx.Limits(max_connections=max_connections, max_keepalive_connections=0), TimingBackend()),
+        )
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return sem
+
+    async def _fetch(self, url: str, fresh: bool, mode: str, extensions: dict) -> tuple[int, float]:
+        """
+        One request in the given probe mode -> (status code, latency in seconds).
+        The response is always streamed, so memory stays bounded whatever the
+        target sends; latency runs until the headers are in ("head"/"headers")
+        or until the (capped) body has been read ("body").
+        """
+        client = self._cold if fresh else self._warm
+        request = client.build_request("HEAD" if mode == "head" else "GET", url, extensions=extensions)
+        async with self._host_slot(url):
+            t0 = time.perf_counter()
+            r = await client.send(request, stream=True)
+            try:
+                latency = time.perf_counter() - t0
+                if mode == "body":
+                    read = 0
+                    async for chunk in r.aiter_raw():
+                        read += len(chunk)
+                        if read >= self.max_body_bytes:
+                            break
+                    latency = time.perf_counter() - t0
+                elif mode == "head":
+                    await r.aread()  # no body; just lets the connection go back to the pool
+                else:
+                    # closing mid-body would throw the connection away; drain it
+                    # (chunked or not) unless it turns out to be big
+                    read = 0
+                    async for chunk in r.aiter_raw():
+                        read += len(chunk)
+                        if read > self.drain_max_bytes:
+                            break
+            finally:
+                await r.aclose()
+        return r.status_code, latency
+
+    async def probe(self, url: str, fresh: bool = False, mode: str = DEFAULT_PROBE_MODE) -> ProbeResult:
+        phases = _Phases()
+        token = current_dns_ms.set(phases.dns)
+        metrics.PROBES_IN_FLIGHT.inc()
+        try:
+            status_code, latency = await self._fetch(url, fresh, mode, {"trace": phases.trace})
+        except httpx.TimeoutException:
+            return ProbeResult(status_code=None, latency_ms=None, error="timeout")
+        except Exception:
+            return ProbeResult(status_code=None, latency_ms=None, error="connection_error")
+        finally:
+            metrics.PROBES_IN_FLIGHT.dec()
+            current_dns_ms.reset(token)
+        metrics.PROBE_LATENCY.observe(latency)
+        return ProbeResult(status_code=status_code, latency_ms=int(latency * 1000), **phases.fields())
+
+    async def aclose(self):
+        await asyncio.gather(self._warm.aclose(), self._cold.aclose(), return_exceptions=True)
+
+
+_client: ProbeClient | None = None
+
+
+def start_probe_client() -> ProbeClient:
+    global _client
+    if _client is None:
+        _client = ProbeClient()
+    return _client
+
+
+def get_probe_client() -> ProbeClient:
+    # lazily create it so routers work even when the scheduler isn't running
+    return _client or start_probe_client()
+
+
+async def close_probe_client():
+    global _client
+    if _client is not None:
+        c, _client = _client, None
+        await c.aclose()
@@ -0,0 +1,333 @@
+# apps/api/app/services/rollups.py
+"""
+Minute/hour rollups of `checks` (count, ok count, latency sum/min/max, and a
+latency quantile sketch, see services/sketch.py).
+
+The check writer calls `record_batch` in the same transaction as the COPY,
+so rollups never drift from the raw rows. Summaries read whole hours from
+check_rollups_hour, the partial hours at the edges from check_rollups_minute
+and only the partial minutes from raw `checks`, so a 30d summary costs about
+the same as a 24h one.
+
+Backfill / repair (recomputes buckets from raw checks, overwriting them):
+
+    python -m app.services.rollups --since 2025-08-01 [--until 2025-09-01] [--monitor ID]
+"""
+import argparse, asyncio, math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..db import async_engine
+from .sketch import LatencySketch
+
+if TYPE_CHECKING:
+    from .ingest import CheckRow
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+
+def floor_minute(t: datetime) -> datetime:
+    return t.replace(second=0, microsecond=0)
+
+
+def floor_hour(t: datetime) -> datetime:
+    return t.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil(t: datetime, floor, step: timedelta) -> datetime:
+    f = floor(t)
+    return f if f == t else f + step
+
+
+def _aggregate(batch: Iterable["CheckRow"], floor) -> Dict[Tuple[str, datetime], list]:
+    acc: Dict[Tuple[str, datetime], list] = defaultdict(lambda: [0, 0, 0, None, None, LatencySketch()])
+    for r in batch:
+        a = acc[(r.monitor_id, floor(r.ts.astimezone(timezone.utc)))]
+        a[0] += 1
+        a[1] += 1 if r.ok else 0
+        a[2] += r.latency_ms
+        a[3] = r.latency_ms if a[3] is None else min(a[3], r.latency_ms)
+        a[4] = r.latency_ms if a[4] is None else max(a[4], r.latency_ms)
+        a[5].add(r.latency_ms)
+    return acc
+
+
+_UPSERT = """
+insert into {table} as r (monitor_id, bucket, n, ok_n, latency_sum, latency_min, latency_max)
+select * from unnest(
+    cast(:mid as text[]), cast(:bucket as timestamptz[]), cast(:n as int[]), cast(:ok_n as int[]),
+    cast(:lsum as bigint[]), cast(:lmin as int[]), cast(:lmax as int[])
+)
+on conflict (monitor_id, bucket) do update set
+    n = r.n + excluded.n,
+    ok_n = r.ok_n + excluded.ok_n,
+    latency_sum = r.latency_sum + excluded.latency_sum,
+    latency_min = least(r.latency_min, excluded.latency_min),
+    latency_max = greatest(r.latency_max, excluded.latency_max)
+returning monitor_id, bucket, sketch
+"""
+
+# sketches can't be merged in SQL: read back the old one (the row is already
+# locked by the upsert above), merge in Python, write the result
+_SET_SKETCH = """
+update {table} as r set sketch = u.sketch
+from unnest(cast(:mid as text[]), cast(:bucket as timestamptz[]), cast(:sketch as bytea[])) as u(monitor_id, bucket, sketch)
+where r.monitor_id = u.monitor_id and r.bucket = u.bucket
+"""
+
+
+async def record_batch(conn: AsyncConnection, batch: Iterable["CheckRow"]):
+    """Fold a batch of new checks into both rollup tables (one statement each)."""
+    for table, floor in (("check_rollups_minute", floor_minute), ("check_rollups_hour", floor_hour)):
+        acc = _aggregate(batch, floor)
+        keys = sorted(acc)  # stable lock order across concurrent writers
+        res = await conn.execute(
+            text(_UPSERT.format(table=table)),
+            {
+                "mid": [k[0] for k in keys],
+                "bucket": [k[1] for k in keys],
+                "n": [acc[k][0] for k in keys],
+                "ok_n": [acc[k][1] for k in keys],
+                "lsum": [acc[k][2] for k in keys],
+                "lmin": [acc[k][3] for k in keys],
+                "lmax": [acc[k][4] for k in keys],
+            },
+        )
+        merged = []
+        for mid, bucket, old in res.all():
+            sk = acc[(mid, bucket)][5]
+            if old is not None:
+                sk.merge(LatencySketch.from_bytes(old))
+            merged.append((mid, bucket, sk.to_bytes()))
+        await _set_sketches(conn, table, merged)
+
+
+async def _set_sketches(conn: AsyncConnection, table: str, rows: List[Tuple[str, datetime, bytes]]):
+    await conn.execute(
+        text(_SET_SKETCH.format(table=table)),
+        {"mid": [r[0] for r in rows], "bucket": [r[1] for r in rows], "sketch": [r[2] for r in rows]},
+    )
+
+
+def _split(start: datetime, end: datetime) -> Tuple[datetime, datetime, datetime, datetime]:
+    """
+    Minute edges [m0, m1) and hour span [h0, h1) of a window: hour rollups
+    cover [h0, h1), minute rollups [m0, h0) and [h1, m1), raw checks the rest.
+    """
+    m0, m1 = _ceil(start, floor_minute, MINUTE), floor_minute(end)
+    h0, h1 = _ceil(start, floor_hour, HOUR), floor_hour(end)
+    if m0 >= m1:        # under a minute: raw only
+        m0 = m1 = h0 = h1 = end
+    elif h0 >= h1:      # under an hour: minutes + raw edges
+        h0 = h1 = m1
+    return m0, m1, h0, h1
+
+
+class WindowStats(NamedTuple):
+    n: int
+    ok_n: int
+    latency_sum: int
+    sketch: LatencySketch
+
+
+async def window_stats(db: AsyncSession, monitor_id: str, start: datetime, end: datetime) -> WindowStats:
+    """Totals and merged latency sketch for checks with start <= ts <= end."""
+    m0, m1, h0, h1 = _split(start, end)
+
+    # at most ~720 hour rows + 2*59 minute rows + the raw edge checks
+    rows = (await db.execute(
+        text(
+            """
+            select n, ok_n, latency_sum, sketch, null::int as latency from check_rollups_hour
+             where monitor_id = :mid and bucket >= :h0 and bucket < :h1
+            union all
+            select n, ok_n, latency_sum, sketch, null from check_rollups_minute
+             where monitor_id = :mid
+               and ((bucket >= :m0 and bucket < :h0) or (bucket >= :h1 and bucket < :m1))
+            union all
+            select 1, ok::int, latency_ms, null, latency_ms from checks
+             where monitor_id = :mid
+               and ((ts >= :start and ts < :m0) or (ts >= :m1 and ts <= :end))
+            """
+        ),
+        {"mid": monitor_id, "start": start, "end": end, "m0": m0, "m1": m1, "h0": h0, "h1": h1},
+    )).all()
+
+    n = ok_n = lsum = 0
+    sk = LatencySketch()
+    for rn, rok, rsum, rsketch, lat in rows:
+        n, ok_n, lsum = n + rn, ok_n + rok, lsum + rsum
+        if lat is not None:
+            sk.add(lat)
+        elif rsketch is not None:
+            sk.merge(LatencySketch.from_bytes(rsketch))
+    return WindowStats(n, ok_n, lsum, sk)
+
+
+async def window_totals_many(db: AsyncSession, monitor_ids: List[str], start: datetime, end: datetime) -> Dict[str, Tuple[int, int, int]]:
+    """window_stats' totals (no sketch) for many monitors in one grouped query."""
+    if not monitor_ids:
+        return {}
+    m0, m1, h0, h1 = _split(start, end)
+
+    rows = (await db.execute(
+        text(
+            """
+            select monitor_id, sum(n) as n, sum(ok_n) as ok_n, sum(lsum) as lsum
+            from (
+                select monitor_id, n, ok_n, latency_sum as lsum from check_rollups_hour
+                 where monitor_id = any(:ids) and bucket >= :h0 and bucket < :h1
+                union all
+                select monitor_id, n, ok_n, latency_sum from check_rollups_minute
+                 where monitor_id = any(:ids)
+                   and ((bucket >= :m0 and bucket < :h0) or (bucket >= :h1 and bucket < :m1))
+                union all
+                select monitor_id, 1, ok::int, latency_ms from checks
+                 where monitor_id = any(:ids)
+                   and ((ts >= :start and ts < :m0) or (ts >= :m1 and ts <= :end))
+            ) parts
+            group by monitor_id
+            """
+        ),
+        {"ids": monitor_ids, "start": start, "end": end, "m0": m0, "m1": m1, "h0": h0, "h1": h1},
+    )).all()
+    return {mid: (int(n), int(ok_n), int(lsum)) for mid, n, ok_n, lsum in rows}
+
+
+_SERIES_RAW = """
+select floor(extract(epoch from ts - :start) / :w)::int as b, count(*) as n, count(*) filter (where ok) as ok_n,
+       min(latency_ms) as lmin, max(latency_ms) as lmax, sum(latency_ms) as lsum
+from checks
+where monitor_id = :mid and ts >= :start and ts < :end
+group by 1 order by 1
+"""
+
+_SERIES_ROLLUP = """
+select floor(extract(epoch from bucket - :start) / :w)::int as b, sum(n) as n, sum(ok_n) as ok_n,
+       min(latency_min) as lmin, max(latency_max) as lmax, sum(latency_sum) as lsum
+from {table}
+where monitor_id = :mid and bucket >= :start and bucket < :end
+group by 1 order by 1
+"""
+
+
+async def series(db: AsyncSession, monitor_id: str, start: datetime, end: datetime, points: int) -> Tuple[float, List[dict]]:
+    """
+    Downsample [start, end) into at most `points` buckets of count/ok/min/max/avg
+    latency, for charts. Reads the coarsest table whose granularity fits the
+    bucket width: hour rollups for >= 1h buckets, minute rollups for >= 1min,
+    raw checks below that. Returns (bucket width in seconds, points); empty
+    buckets are omitted.
+    """
+    w = max((end - start).total_seconds() / points, 1.0)
+    # rollup-backed widths are rounded up to whole rollup buckets so every
+    # chart bucket covers the same number of them (and points stays <= N)
+    if w >= HOUR.total_seconds():
+        w = math.ceil(w / HOUR.total_seconds()) * HOUR.total_seconds()
+        sql = _SERIES_ROLLUP.format(table="check_rollups_hour")
+    elif w >= MINUTE.total_seconds():
+        w = math.ceil(w / MINUTE.total_seconds()) * MINUTE.total_seconds()
+        sql = _SERIES_ROLLUP.format(table="check_rollups_minute")
+    else:
+        sql = _SERIES_RAW
+    rows = (await db.execute(text(sql), {"mid": monitor_id, "start": start, "end": end, "w": w})).mappings().all()
+    return w, [
+        {
+            "ts": start + timedelta(seconds=r["b"] * w),
+            "n": int(r["n"]),
+            "ok_n": int(r["ok_n"]),
+            "latency_min": r["lmin"],
+            "latency_max": r["lmax"],
+            "latency_avg": round(float(r["lsum"]) / int(r["n"]), 1),
+        }
+        for r in rows
+    ]
+
+
+_REPAIR = """
+insert into {table} (monitor_id, bucket, n, ok_n, latency_sum, latency_min, latency_max)
+select monitor_id, date_trunc(:unit, ts, 'UTC'), count(*), count(*) filter (where ok),
+       sum(latency_ms), min(latency_ms), max(latency_ms)
+from checks
+where ts >= :a and ts < :b {monitor_filter}
+group by 1, 2
+on conflict (monitor_id, bucket) do update set
+    n = excluded.n, ok_n = excluded.ok_n, latency_sum = excluded.latency_sum,
+    latency_min = excluded.latency_min, latency_max = excluded.latency_max
+"""
+
+
+_REPAIR_SKETCH = """
+select monitor_id, date_trunc(:unit, ts, 'UTC'), array_agg(latency_ms)
+from checks
+where ts >= :a and ts < :b {monitor_filter}
+group by 1, 2
+"""
+
+
+async def backfill(since: datetime, until: datetime, monitor_id: str | None = None, chunk: timedelta = timedelta(days=1)):
+    """
+    Recompute rollups from raw checks for [since, until), one chunk per transaction.
+    Buckets with raw rows are overwritten; buckets whose raw rows are gone
+    (e.g. dropped by retention) are left alone.
+    """
+    since, until = floor_hour(since), floor_hour(until)
+    params = {"mid": monitor_id} if monitor_id else {}
+    monitor_filter = "and monitor_id = :mid" if monitor_id else ""
+    a = since
+    while a < until:
+        b = min(a + chunk, until)
+        async with async_engine.begin() as conn:
+            for table, unit in (("check_rollups_minute", "minute"), ("check_rollups_hour", "hour")):
+                await conn.execute(
+                    text(_REPAIR.format(table=table, monitor_filter=monitor_filter)),
+                    {"unit": unit, "a": a, "b": b, **params},
+                )
+                # sketches are built client-side; stream the latencies bucket by bucket
+                res = await conn.stream(
+                    text(_REPAIR_SKETCH.format(monitor_filter=monitor_filter)),
+                    {"unit": unit, "a": a, "b": b, **params},
+                )
+                pending = []
+                async for mid, bucket, lats in res:
+                    sk = LatencySketch()
+                    sk.update(lats)
+                    pending.append((mid, bucket, sk.to_bytes()))
+                    if len(pending) >= 1000:
+                        await _set_sketches(conn, table, pending)
+                        pending = []
+                if pending:
+                    await _set_sketches(conn, table, pending)
+        print(f"rollups repaired {a.isoformat()} .. {b.isoformat()}")
+        a = b
+
+
+def _parse_ts(s: str) -> datetime:
+    t = datetime.fromisoformat(s)
+    return t if t.tzinfo else t.replace(tzinfo=timezone.utc)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Backfill / repair check rollups from raw checks")
+    p.add_argument("--since", required=True, type=_parse_ts)
+    # default stops at the current hour, which the live writer is still filling
+    p.add_argument("--until", type=_parse_ts, default=floor_hour(datetime.now(timezone.utc)))
+    p.add_argument("--monitor", default=None)
+    args = p.parse_args()
+
+    async def run():
+        try:
+            await backfill(args.since, args.until, args.monitor)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,133 +1,305 @@
-import asyncio, time
-import httpx
-from typing import Dict, Set, Tuple
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import select, desc
-from sqlalchemy.orm import Session
+import asyncio, logging, threading, time
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+from sqlalchemy import text
 from datetime import datetime, timezone
 
-from ..db import SessionLocal
-from ..models import Monitor, Check, Incident
+from ..db import async_engine
+from ..models import Monitor
 from ..utils import normalize_url
+from .probe_client import start_probe_client, close_probe_client, get_probe_client, group_mode
+from . import admission, ingest, latest, metrics
+from .ingest import CheckRow, start_writer, stop_writer
+from .incidents import incident_engine
+from .timing_wheel import TimingWheel, next_due, stable_hash
+from .cluster import Cluster, publish_group_changes
+from .partitions import maintenance_loop
+from ..config import settings
 
-scheduler: AsyncIOScheduler | None = None
-# Map (url, interval) -> job_id
-job_ids: Dict[Tuple[str, int], str] = {}
+class GroupMember(NamedTuple):
+    # just what fan-out needs from a monitor
+    id: str
+    expected_status: int
+    fresh_connection: bool
+    probe_mode: str
+
+# one wheel entry per (url, interval) group *owned by this process*
+scheduler: TimingWheel | None = None
+# every known group in the fleet -> its stable hash (for ring ownership)
+groups: Dict[Tuple[str, int], int] = {}
+# every known group -> its monitors. Built by the startup load, then kept in
+# step by the monitor routes (directly, or via NOTIFY in cluster mode), so a
+# probe tick never reads the DB. Lists are replaced, never mutated, so a tick
+# that is mid-probe keeps a consistent view.
+members: Dict[Tuple[str, int], List[GroupMember]] = {}
+cluster: Cluster | None = None
+# group -> epoch seconds of its last check, from the startup load; consumed when the group is put on the wheel
+_last_checked: Dict[Tuple[str, int], float] = {}
+# registry changes that arrive while a full load is streaming; replayed on top
+# of its snapshot, which may predate them
+_replay: List[tuple] | None = None
+_tasks: list[asyncio.Task] = []
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: int | None = None
+
+log = logging.getLogger(__name__)
+
+metrics.Gauge("uptime_scheduler_groups", "Groups on this node's wheel", fn=lambda: len(scheduler) if scheduler is not None else 0)
+metrics.Gauge("uptime_scheduler_known_groups", "Groups known fleet-wide", fn=lambda: len(groups))
 
 def job_key(url: str, interval: int) -> Tuple[str, int]:
     return (normalize_url(url), int(interval))
 
 async def ping_group(url: str, interval_sec: int):
-    # one HTTP request
-    started = datetime.now(timezone.utc)
-    status_code = None
-    latency_ms = None
+    # who listens to this (url, interval)?
+    monitors = members.get((url, interval_sec))
+    if not monitors:
+        return
 
+    # one HTTP request; cold if any monitor in the group asked for it, and
+    # reading as much as the most demanding monitor wants
+    fresh = any(m.fresh_connection for m in monitors)
+    # wait for a global / per-host slot; a result older than the interval is no use, so give up by then
+    if not await admission.controller.acquire(url, min(interval_sec, settings.PROBE_QUEUE_MAX_WAIT_SEC)):
+        return
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
-            r = await client.get(url)
-            status_code = r.status_code
-            latency_ms = int(r.elapsed.total_seconds() * 1000)
-    except Exception:
-        status_code = None
-        latency_ms = None
-
-    # fan-out to all monitors for this (url, interval)
-    db: Session = SessionLocal()
-    try:
-        monitors = db.execute(
-            select(Monitor).where(Monitor.url == url, Monitor.interval_sec == interval_sec)
-        ).scalars().all()
-
-        for m in monitors:
-            ok = (status_code is not None and status_code == m.expected_status)
-            check = Check(
-                monitor_id=m.id,
-                status_code=status_code or 0,
-                ok=ok,
-                latency_ms=latency_ms or 0,
-                ts=started,
-            )
-            db.add(check)
-        db.commit()
+        started = datetime.now(timezone.utc)
+        res = await get_probe_client().probe(url, fresh=fresh, mode=group_mode(m.probe_mode for m in monitors))
     finally:
-        db.close()
+        admission.controller.release()
 
-def schedule_monitor(m: Monitor, immediate: bool = False):
-    global scheduler
-    if not scheduler:
-        return
-    url = normalize_url(m.url)
-    key = job_key(url, m.interval_sec)
-    job_id = job_ids.get(key)
-
-    # create the shared interval job if needed
-    if not job_id:
-        job_id = f"group:{hash(key)}"
-        scheduler.add_job(
-            ping_group,
-            "interval",
-            seconds=int(m.interval_sec),
-            id=job_id,
-            args=[url, int(m.interval_sec)],
-            replace_existing=True,
-        )
-        job_ids[key] = job_id
-
-    # first run now (one-shot) – safe because it just fans out
-    if immediate:
-        scheduler.add_job(
-            ping_group,
-            "date",
-            run_date=datetime.now(timezone.utc),
-            args=[url, int(m.interval_sec)],
-            misfire_grace_time=30,
+    # fan-out to all monitors for this (url, interval); the writer batches the insert
+    rows = [
+        CheckRow(
+            monitor_id=m.id,
+            status_code=res.status_code or 0,
+            ok=(res.status_code is not None and res.status_code == m.expected_status),
+            latency_ms=res.latency_ms or 0,
+            ts=started,
+            dns_ms=res.dns_ms,
+            connect_ms=res.connect_ms,
+            tls_ms=res.tls_ms,
+            ttfb_ms=res.ttfb_ms,
+            reused=res.reused,
         )
+        for m in monitors
+    ]
+    # one outcome per HTTP request; per-monitor results go to their own series
+    if res.error == "timeout":
+        metrics.PROBE_TIMEOUT.inc()
+    elif res.error is not None:
+        metrics.PROBE_CONNECT_ERROR.inc()
+    elif all(r.ok for r in rows):
+        metrics.PROBE_OK.inc()
+    else:
+        metrics.PROBE_STATUS_MISMATCH.inc()
+    ok_n = sum(r.ok for r in rows)
+    metrics.CHECK_OK.inc(ok_n)
+    metrics.CHECK_FAILED.inc(len(rows) - ok_n)
+    latest.cache.record(rows, interval_sec)
+    if ingest.writer is not None:
+        await ingest.writer.submit(rows)
+    # up/down transitions -> incidents rows
+    await incident_engine.observe(rows, interval_sec)
+
+def _on_loop(fn, *args):
+    """Run fn on the scheduler's loop; sync routes call us from the threadpool."""
+    if threading.get_ident() == _loop_thread:
+        fn(*args)
+    elif _loop is not None:
+        _loop.call_soon_threadsafe(fn, *args)
+
+def _owned(key: Tuple[str, int]) -> bool:
+    return cluster is None or cluster.owns(groups[key])
+
+def _add_monitors(rows: List[list], immediate: bool):
+    """rows: [url, interval, id, expected_status, fresh_connection, probe_mode]"""
+    if scheduler is None:
+        return
+    if _replay is not None:
+        _replay.append((_add_monitors, rows, False))
+    added: Dict[Tuple[str, int], List[GroupMember]] = {}
+    for url, interval, *m in rows:
+        added.setdefault((url, int(interval)), []).append(GroupMember(*m))
+    for key, new in added.items():
+        have = members.get(key, [])
+        ids = {m.id for m in have}
+        members[key] = have + [m for m in new if m.id not in ids]
+        groups.setdefault(key, stable_hash(key))
+        if not _owned(key):
+            continue
+        url, interval = key
+        scheduler.add(key, interval, ping_group, url, interval)
+        # first run now (one-shot) – safe because it just fans out
+        if immediate:
+            scheduler.run_now(key)
+
+def _remove_monitors(rows: List[list]):
+    """rows: [url, interval, id]; a group goes away with its last monitor"""
+    if _replay is not None:
+        _replay.append((_remove_monitors, rows))
+    gone: Dict[Tuple[str, int], Set[str]] = {}
+    for url, interval, monitor_id in rows:
+        gone.setdefault((url, int(interval)), set()).add(monitor_id)
+    for key, ids in gone.items():
+        left = [m for m in members.get(key, []) if m.id not in ids]
+        if left:
+            members[key] = left
+        else:
+            _remove_group(key)
+
+def _remove_group(key: Tuple[str, int]):
+    groups.pop(key, None)
+    members.pop(key, None)
+    _last_checked.pop(key, None)
+    if scheduler is not None:
+        scheduler.remove(key)
+
+def _rebalance():
+    """Make the wheel hold exactly the known groups this node owns."""
+    if scheduler is None:
+        return
+    added = removed = 0
+    now = time.time()
+    for key in groups:
+        mine = _owned(key)
+        if mine and key not in scheduler:
+            # resume: stay on the group's phase grid, but not sooner than half an
+            # interval after its last check (e.g. one run right before a restart)
+            last = _last_checked.pop(key, None)
+            first_due = next_due(key, key[1], max(now, last + key[1] / 2)) if last is not None else None
+            scheduler.add(key, key[1], ping_group, key[0], key[1], first_due=first_due)
+            added += 1
+        elif not mine and key in scheduler:
+            scheduler.remove(key)
+            removed += 1
+    log.info("rebalanced: +%d -%d, owning %d of %d groups", added, removed, len(scheduler), len(groups))
+
+def _on_group_event(ev: dict):
+    if ev["op"] == "members":
+        if cluster is not None:
+            cluster.poke()
+        return
+    if ev["op"] == "add":
+        _add_monitors(ev["monitors"], bool(ev.get("immediate")))
+    elif ev["op"] == "remove":
+        _remove_monitors(ev["monitors"])
+
+def _member_row(m) -> list:
+    """A Monitor (or a dict with its columns) as an "add" row."""
+    get = m.get if isinstance(m, dict) else lambda c: getattr(m, c)
+    url, interval = job_key(get("url"), get("interval_sec"))
+    return [url, interval, get("id"), get("expected_status"), bool(get("fresh_connection")), get("probe_mode")]
+
+def schedule_monitors(ms: Iterable, immediate: bool = False):
+    """Register many monitors (Monitor objects or column dicts) at once (one NOTIFY round trip in cluster mode)."""
+    rows = [_member_row(m) for m in ms]
+    if settings.CLUSTER_ENABLED:
+        # every node (this one, if it schedules at all, and any app.worker) picks
+        # them up via LISTEN; only the owner probes
+        publish_group_changes("add", rows, immediate)
+    elif scheduler is not None:
+        _on_loop(_add_monitors, rows, immediate)
+
+def schedule_monitor(m: Monitor, immediate: bool = False):
+    schedule_monitors([m], immediate)
 
 def unschedule_monitor(m: Monitor):
     """
-    Remove the shared job ONLY if no monitors remain for this (url, interval).
+    Drop the monitor from its group; the shared job goes once the group is empty.
     """
-    global scheduler
-    if not scheduler:
-        return
-    url = normalize_url(m.url)
-    key = job_key(url, m.interval_sec)
-    job_id = job_ids.get(key)
-    if not job_id:
-        return
+    url, interval = job_key(m.url, m.interval_sec)
+    rows = [[url, interval, m.id]]
+    if settings.CLUSTER_ENABLED:
+        publish_group_changes("remove", rows)
+    elif scheduler is not None:
+        _on_loop(_remove_monitors, rows)
 
-    # check if other monitors still use this (url, interval)
-    db: Session = SessionLocal()
-    try:
-        remaining = db.execute(
-            select(Monitor.id).where(Monitor.url == url, Monitor.interval_sec == m.interval_sec)
-        ).all()
-    finally:
-        db.close()
-
-    # exactly one (this one) means after delete there will be none -> remove job
-    if len(remaining) <= 1:
-        try:
-            j = scheduler.get_job(job_id)
-            if j:
-                j.remove()
-        except Exception:
-            pass
-        job_ids.pop(key, None)
+# every monitor's fan-out columns plus when it was last checked (one index
+# probe per monitor into the recent partitions only)
+_MONITORS_SQL = text(
+    """
+    select m.url, m.interval_sec, m.id, m.expected_status, m.fresh_connection, m.probe_mode, last.ts
+    from monitors m
+    left join lateral (
+        select c.ts from checks c
+        where c.monitor_id = m.id and c.ts >= now() - make_interval(secs => m.interval_sec)
+        order by c.ts desc
+        limit 1
+    ) last on true
+    """
+)
 
 async def load_all_monitors_and_schedule():
-    db = SessionLocal()
+    """(Re)build the group registry from the DB and reconcile the wheel with it."""
+    global _replay
+    t0 = time.perf_counter()
+    current: Dict[Tuple[str, int], List[GroupMember]] = {}
+    last: Dict[Tuple[str, int], float] = {}
+    n = 0
+    _replay = []
     try:
-        for mon in db.query(Monitor).all():
-            schedule_monitor(mon)
+        async with async_engine.connect() as conn:
+            result = await conn.stream(_MONITORS_SQL.execution_options(yield_per=5000))
+            async for chunk in result.partitions():
+                for url, interval, monitor_id, expected, fresh, mode, ts in chunk:
+                    key = (url, int(interval))
+                    current.setdefault(key, []).append(GroupMember(monitor_id, expected, fresh, mode))
+                    if ts is not None:
+                        last[key] = max(last.get(key, 0.0), ts.timestamp())
+                n += len(chunk)
     finally:
-        db.close()
+        replay, _replay = _replay, None
+    t1 = time.perf_counter()
+
+    for key in [k for k in groups if k not in current]:
+        _remove_group(key)
+    members.update(current)
+    for key in current:
+        groups.setdefault(key, stable_hash(key))
+    _last_checked.update(last)
+    # creates/deletes seen while streaming: adds dedupe by id, removes of rows
+    # the snapshot no longer has are no-ops
+    for fn, *args in replay:
+        fn(*args)
+    _rebalance()
+    t2 = time.perf_counter()
+    log.info(
+        "loaded %d monitors in %d groups in %.0f ms (query %.0f ms, register %.0f ms), %d resumed from their last check",
+        n, len(current), (t2 - t0) * 1000, (t1 - t0) * 1000, (t2 - t1) * 1000, len(last),
+    )
 
-def start_scheduler():
-    global scheduler
-    scheduler = AsyncIOScheduler()
+def start_scheduler(node_id: str | None = None):
+    global scheduler, cluster, _loop, _loop_thread
+    _loop = asyncio.get_event_loop()
+    _loop_thread = threading.get_ident()
+    start_probe_client()
+    start_writer()
+    scheduler = TimingWheel()
     scheduler.start()
-    # kick off initial schedule (fire and forget)
-    asyncio.get_event_loop().create_task(load_all_monitors_and_schedule())
+    _tasks.append(_loop.create_task(maintenance_loop()))
+    if settings.CLUSTER_ENABLED:
+        # the listener loads all groups once connected (and again after any reconnect)
+        cluster = Cluster(node_id)
+        _tasks.append(_loop.create_task(cluster.run(_rebalance)))
+        _tasks.append(_loop.create_task(cluster.listen(_on_group_event, load_all_monitors_and_schedule)))
+    else:
+        # kick off initial schedule (fire and forget)
+        _tasks.append(_loop.create_task(load_all_monitors_and_schedule()))
 
+async def stop_scheduler():
+    global scheduler, cluster
+    for t in _tasks:
+        t.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    if cluster is not None:
+        await cluster.leave()  # hand our groups over right away instead of after lease expiry
+        cluster = None
+    if scheduler is not None:
+        await scheduler.stop()
+        scheduler = None
+    groups.clear()
+    members.clear()
+    _last_checked.clear()
+    await stop_writer()  # drain buffered checks
+    await close_probe_client()
@@ -0,0 +1,116 @@
+# apps/api/app/services/sketch.py
+import math
+from typing import Dict, Iterable, Optional
+
+# relative accuracy of every quantile (1% -> p99 of 800ms is reported as 792..808ms)
+ALPHA = 0.01
+_GAMMA = (1 + ALPHA) / (1 - ALPHA)
+_LOG_GAMMA = math.log(_GAMMA)
+_VERSION = 1
+
+
+def _put_varint(out: bytearray, v: int):
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _get_varint(b: bytes, i: int) -> tuple[int, int]:
+    v = shift = 0
+    while True:
+        c = b[i]
+        i += 1
+        v |= (c & 0x7F) << shift
+        if c < 0x80:
+            return v, i
+        shift += 7
+
+
+def _zigzag(v: int) -> int:
+    return (v << 1) ^ (v >> 63)
+
+
+def _unzigzag(v: int) -> int:
+    return (v >> 1) ^ -(v & 1)
+
+
+class LatencySketch:
+    """
+    DDSketch-style quantile sketch for latencies (ms).
+
+    A value x > 0 is counted in bin ceil(log_gamma(x)); every value in a bin
+    is within ALPHA of the bin's representative value, so quantiles have a
+    bounded relative error no matter how many samples went in. Two sketches
+    merge by adding bin counts, which is what lets per-minute/per-hour
+    sketches be combined for any window. 0-10s at 1% is ~470 bins at most;
+    a real monitor touches a few dozen, a few bytes each once serialized.
+    """
+
+    __slots__ = ("bins", "zero", "count")
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.zero = 0   # values <= 0 (e.g. probes that never got a response)
+        self.count = 0
+
+    def add(self, x: float, n: int = 1):
+        if x <= 0:
+            self.zero += n
+        else:
+            k = math.ceil(math.log(x) / _LOG_GAMMA)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+
+    def update(self, xs: Iterable[float]):
+        for x in xs:
+            self.add(x)
+
+    def merge(self, other: "LatencySketch"):
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return 2 * _GAMMA ** k / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.bins) / (_GAMMA + 1)
+
+    def to_bytes(self) -> bytes:
+        """version, zero count, bin count, then (key delta, count) varint pairs."""
+        out = bytearray([_VERSION])
+        _put_varint(out, self.zero)
+        _put_varint(out, len(self.bins))
+        prev = 0
+        for k in sorted(self.bins):
+            _put_varint(out, _zigzag(k - prev))
+            _put_varint(out, self.bins[k])
+            prev = k
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, b: bytes | None) -> "LatencySketch":
+        s = cls()
+        if not b:
+            return s
+        if b[0] != _VERSION:
+            raise ValueError(f"unknown sketch version {b[0]}")
+        s.zero, i = _get_varint(b, 1)
+        nbins, i = _get_varint(b, i)
+        k = 0
+        for _ in range(nbins):
+            d, i = _get_varint(b, i)
+            n, i = _get_varint(b, i)
+            k += _unzigzag(d)
+            s.bins[k] = n
+        s.count = s.zero + sum(s.bins.values())
+        return s
@@ -0,0 +1,70 @@
+# apps/api/app/services/status_cache.py
+import asyncio, hashlib, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict
+
+from ..config import settings
+
+
+@dataclass
+class CachedPage:
+    body: bytes | None              # None = no such slug (short negative cache)
+    etag: str
+    last_modified: datetime | None
+    expires: float                  # time.time() after which it is rebuilt
+
+    def max_age(self) -> int:
+        return max(0, int(self.expires - time.time()))
+
+
+def make_page(body: bytes | None, last_modified: datetime | None, ttl: float) -> CachedPage:
+    etag = '"' + hashlib.blake2b(body or b"", digest_size=12).hexdigest() + '"'
+    return CachedPage(body, etag, last_modified, time.time() + ttl)
+
+
+class StatusPageCache:
+    """
+    Rendered public status pages, keyed by slug.
+
+    Pages are rebuilt when the monitor's next check is due (the builder
+    picks the TTL), so a page never outlives the data it shows by more than
+    one interval. Concurrent misses for the same slug share one build
+    (single-flight): the first request starts it, the rest await the same
+    task, so a viral page costs one set of queries per interval per process.
+    """
+
+    def __init__(self, max_entries: int = settings.STATUS_CACHE_MAX):
+        self.max_entries = max_entries
+        self._pages: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, slug: str, build: Callable[[], Awaitable[CachedPage]]) -> CachedPage:
+        page = self._pages.get(slug)
+        if page is not None and page.expires > time.time():
+            self._pages.move_to_end(slug)
+            return page
+
+        task = self._inflight.get(slug)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(build())
+            self._inflight[slug] = task
+            task.add_done_callback(lambda t, slug=slug: self._done(slug, t))
+        # shield: a client hanging up must not cancel the build the others are waiting on
+        return await asyncio.shield(task)
+
+    def _done(self, slug: str, task: asyncio.Task):
+        self._inflight.pop(slug, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._pages[slug] = task.result()
+        self._pages.move_to_end(slug)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def discard(self, slug: str):
+        self._pages.pop(slug, None)
+
+
+cache = StatusPageCache()
@@ -0,0 +1,189 @@
+# apps/api/app/services/timing_wheel.py
+import asyncio, hashlib, logging, time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from ..config import settings
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+
+def stable_hash(key: Hashable) -> int:
+    """Process-independent hash (builtin hash() is salted per interpreter)."""
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "big")
+
+
+def phase_offset(key: Hashable, interval: float) -> float:
+    """Deterministic offset in [0, interval) so groups sharing an interval don't fire together."""
+    return (stable_hash(key) % int(interval * 1000)) / 1000.0
+
+
+def next_due(key: Hashable, interval: float, after: float) -> float:
+    """First wall-clock time > `after` that lies on this key's phase grid."""
+    phase = phase_offset(key, interval)
+    n = (after - phase) // interval + 1
+    return n * interval + phase
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        metrics.SCHEDULER_JOB_FAILURES.inc()
+        log.error("scheduled job failed", exc_info=task.exception())
+
+
+@dataclass(eq=False)
+class _Entry:
+    key: Hashable
+    interval: float
+    fn: Callable[..., Awaitable[Any]]
+    args: Tuple
+    due: float
+    slot: int = -1
+    running: asyncio.Task | None = field(default=None, repr=False)
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel for periodic jobs.
+
+    Time is cut into `tick` second ticks; an entry due at tick T lives in
+    slot T % slots, so adding or removing a job is a dict insert/delete and
+    each tick only looks at the entries hashed to its slot. Entries further
+    out than one revolution just stay in their slot until their tick comes.
+
+    Every key gets a stable phase inside its interval (see `phase_offset`),
+    so 10k monitors at 60s are spread evenly across the minute, and keep
+    the same phase across restarts and across processes.
+    """
+
+    def __init__(self, tick: float = settings.SCHEDULER_TICK_SEC, slots: int = settings.SCHEDULER_WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: list[Dict[Hashable, _Entry]] = [dict() for _ in range(slots)]
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._task: asyncio.Task | None = None
+        self._cursor: int | None = None  # last tick processed
+        # start lag (seconds after due) of recent runs, for reporting
+        self.lags: deque[float] = deque(maxlen=settings.SCHEDULER_LAG_SAMPLES)
+        self.skipped = 0  # runs not started because the previous one was still going
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def keys(self):
+        return self._entries.keys()
+
+    def _tick_of(self, t: float) -> int:
+        return int(t // self.tick)
+
+    def _place(self, e: _Entry):
+        # never place behind the cursor, or the entry would wait a full revolution
+        t = self._tick_of(e.due)
+        if self._cursor is not None and t <= self._cursor:
+            t = self._cursor + 1
+        e.slot = t % self.slots
+        self._wheel[e.slot][e.key] = e
+
+    def add(self, key: Hashable, interval: float, fn: Callable[..., Awaitable[Any]], *args, first_due: float | None = None) -> bool:
+        """Register a periodic job. Returns False if the key is already scheduled."""
+        if key in self._entries:
+            return False
+        due = first_due if first_due is not None else next_due(key, interval, time.time())
+        e = _Entry(key=key, interval=float(interval), fn=fn, args=args, due=due)
+        self._entries[key] = e
+        self._place(e)
+        return True
+
+    def remove(self, key: Hashable) -> bool:
+        e = self._entries.pop(key, None)
+        if e is None:
+            return False
+        self._wheel[e.slot].pop(key, None)
+        return True
+
+    def run_now(self, key: Hashable) -> bool:
+        """One-off run outside the regular phase (e.g. right after creation)."""
+        e = self._entries.get(key)
+        if e is None:
+            return False
+        self._launch(e)
+        return True
+
+    def _launch(self, e: _Entry):
+        if e.running is not None and not e.running.done():
+            self.skipped += 1
+            metrics.SCHEDULER_SKIPPED.inc()
+            return
+        e.running = asyncio.get_running_loop().create_task(e.fn(*e.args))
+        e.running.add_done_callback(_log_failure)
+
+    def _advance(self, now: float):
+        now_tick = self._tick_of(now)
+        if self._cursor is None:
+            # first tick: sweep the whole wheel once so entries added before start aren't missed
+            self._cursor = now_tick - self.slots
+        fired = []
+        # after a long stall, one revolution already covers every slot
+        start = max(self._cursor + 1, now_tick - self.slots + 1)
+        for t in range(start, now_tick + 1):
+            bucket = self._wheel[t % self.slots]
+            if not bucket:
+                continue
+            due_now = [e for e in bucket.values() if self._tick_of(e.due) <= now_tick]
+            for e in due_now:
+                del bucket[e.key]
+                lag = max(0.0, now - e.due)
+                self.lags.append(lag)
+                metrics.SCHEDULER_LAG.observe(lag)
+                self._launch(e)
+                # next slot on the phase grid; skip missed periods instead of bursting
+                e.due += e.interval
+                if e.due <= now:
+                    e.due = next_due(e.key, e.interval, now)
+                fired.append(e)
+        self._cursor = now_tick
+        for e in fired:
+            self._place(e)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            try:
+                self._advance(now)
+            except Exception:
+                log.exception("timing wheel tick failed")
+            # sleep to the next tick boundary
+            await asyncio.sleep(self.tick - (time.time() % self.tick))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def lag_stats(self) -> Dict[str, float | int]:
+        """Percentiles of recent start lag, in milliseconds."""
+        xs = sorted(self.lags)
+        if not xs:
+            return {"samples": 0, "groups": len(self), "skipped": self.skipped}
+        pick = lambda q: round(xs[min(len(xs) - 1, int(q * len(xs)))] * 1000, 2)
+        return {
+            "samples": len(xs),
+            "groups": len(self),
+            "skipped": self.skipped,
+            "p50_ms": pick(0.50),
+            "p99_ms": pick(0.99),
+            "max_ms": round(xs[-1] * 1000, 2),
+        }
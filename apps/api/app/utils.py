@@ -53,3 +53,33 @@ def normalize_url(u: str) -> str:
     if path != "/" and path.endswith("/"):
         path = path.rstrip("/")
     return urlunparse((p.scheme, netloc, path, "", p.query, ""))  # no fragment
+
+def allocate_slugs(bases: list[str], taken: set[str]) -> list[str]:
+    """
+    Slugs for many new monitors at once, same scheme as unique_slug
+    (base, base-2, base-3, ...). `taken` must hold every existing slug equal
+    to or starting with "<base>-" for these bases (one query, see bulk create).
+    """
+    want = set(bases)
+    top: dict[str, int] = {}  # highest numeric suffix in use per base
+    for s in taken:
+        head, _, n = s.rpartition("-")
+        if n.isdigit() and head in want:
+            top[head] = max(top.get(head, 1), int(n))
+
+    used = set(taken)
+    out, nxt = [], {}
+    for base in bases:
+        if base not in nxt:
+            nxt[base] = top.get(base, 1) + 1
+            if base not in used:
+                used.add(base)
+                out.append(base)
+                continue
+        while f"{base}-{nxt[base]}" in used:  # another base in the batch, e.g. "foo-2" next to "foo"
+            nxt[base] += 1
+        slug = f"{base}-{nxt[base]}"
+        used.add(slug)
+        out.append(slug)
+        nxt[base] += 1
+    return out
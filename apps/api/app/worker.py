@@ -0,0 +1,110 @@
+# apps/api/app/worker.py
+"""
+Standalone probe worker: the scheduler, probe client and check writer
+without the HTTP API.
+
+    python -m app.worker                  # one process per CPU (or WORKER_PROCESSES)
+    python -m app.worker --processes 4
+
+Each process has its own event loop and joins the scheduler cluster as a
+node named "<host>:w<index>", so the consistent-hash ring gives every
+process a fixed slice of the (url, interval) groups. A restarted process
+takes back the same slice, and workers on other hosts just add more
+nodes. Group changes reach the workers as NOTIFYs on the `uptime_groups`
+channel, which the API publishes from its monitor routes. Run the API with
+SCHEDULER_IN_API=false so it only publishes and doesn't probe as well.
+
+The parent process only supervises: it restarts a child that dies and, on
+SIGTERM/SIGINT, stops all of them. Each child drains its buffered checks
+and releases its lease before it exits.
+"""
+import argparse, asyncio, logging, multiprocessing, os, signal, socket, sys, time
+
+from .config import settings
+
+log = logging.getLogger("app.worker")
+
+
+async def _serve(node_id: str):
+    from .db import async_engine
+    from .services.scheduler import start_scheduler, stop_scheduler
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    start_scheduler(node_id=node_id)
+    log.info("worker %s (pid %d) started", node_id, os.getpid())
+    await stop.wait()
+    log.info("worker %s stopping", node_id)
+    await stop_scheduler()
+    await async_engine.dispose()
+
+
+def _child(node_id: str):
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s {node_id} %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per probe otherwise
+    asyncio.run(_serve(node_id))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.worker", description="Run the probe scheduler without the API.")
+    p.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES or os.cpu_count() or 1)
+    p.add_argument("--name", default=socket.gethostname(), help="node id prefix (default: hostname)")
+    a = p.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if not settings.CLUSTER_ENABLED:
+        # without the cluster there is no NOTIFY listener, so API-side changes would never arrive
+        p.error("the worker needs CLUSTER_ENABLED=true")
+
+    # spawn, not fork: children build their own engines, pools and event loop
+    ctx = multiprocessing.get_context("spawn")
+    ids = [f"{a.name}:w{i}" for i in range(a.processes)]
+    procs: dict[str, multiprocessing.Process] = {}
+    restarts: dict[str, float] = {}
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    def _start(node_id: str):
+        proc = ctx.Process(target=_child, args=(node_id,), name=node_id, daemon=False)
+        proc.start()
+        procs[node_id] = proc
+
+    for node_id in ids:
+        _start(node_id)
+    log.info("started %d worker processes", len(ids))
+
+    while not stopping:
+        time.sleep(1)
+        for node_id, proc in list(procs.items()):
+            if proc.is_alive() or stopping:
+                continue
+            # back off a crash-looping child instead of respawning it every second
+            if time.monotonic() - restarts.get(node_id, 0) < 10:
+                continue
+            log.warning("worker %s exited with %s; restarting", node_id, proc.exitcode)
+            restarts[node_id] = time.monotonic()
+            _start(node_id)
+
+    for proc in procs.values():
+        if proc.is_alive():
+            os.kill(proc.pid, signal.SIGTERM)
+    deadline = time.monotonic() + 30
+    for proc in procs.values():
+        proc.join(max(0.0, deadline - time.monotonic()))
+        if proc.is_alive():
+            log.warning("worker %s didn't stop in time; killing it", proc.name)
+            proc.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
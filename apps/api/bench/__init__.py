@@ -0,0 +1 @@
+"""Load test / benchmark harness: `python -m bench --help`."""
@@ -0,0 +1,311 @@
+# apps/api/bench/__main__.py
+"""
+Single-instance load test for the probe pipeline and the hot read APIs.
+
+    cd apps/api
+    DATABASE_URL=postgresql://.../uptime_bench python -m bench --users 20 --monitors 5000 --duration 120 --out bench.json
+
+What it does, all in this one process (no external network):
+  1. starts a fake target farm on 127.0.0.1 (bench/farm.py)
+  2. seeds N users / M monitors pointing at it (marked with @bench.invalid emails)
+  3. runs the real scheduler (timing wheel -> probe client -> check writer ->
+     rollups/incidents), plus concurrent readers of monitor_summary and
+     public_status through the ASGI app
+  4. after a warm-up, measures for --duration seconds and prints JSON
+  5. deletes what it seeded (unless --keep)
+
+Use a scratch database at Alembic head: the scheduler also probes any
+monitors that were already there (those show up in checks/sec, not in the
+per-bench DB row count). Cluster mode is off unless --cluster is given, so
+another running node can't take groups away mid-run.
+"""
+import argparse, asyncio, json, os, platform, random, subprocess, sys, time
+from datetime import datetime, timezone
+
+
+def _args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n\n")[0])
+    p.add_argument("--users", type=int, default=10)
+    p.add_argument("--monitors", type=int, default=1000)
+    p.add_argument("--share", type=int, default=1, help="monitors per (url, interval) group")
+    p.add_argument("--interval", type=int, default=60, help="monitor interval_sec")
+    p.add_argument("--probe-mode", default="headers", choices=("head", "headers", "body"))
+    p.add_argument("--fresh-pct", type=float, default=0.0, help="%% of groups probed on a fresh connection")
+    p.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=None, help="seconds before measuring (default: one interval)")
+    # target farm
+    p.add_argument("--hosts", type=int, default=8, help="fake target hosts (one listener each; probes are rate-limited per host)")
+    p.add_argument("--latency-ms", type=int, default=30)
+    p.add_argument("--jitter", type=float, default=0.2)
+    p.add_argument("--mix", default="ok=94,error=3,timeout=1,slow=1,reset=1",
+                   help="share of targets per mode (ok, error, timeout, slow, reset)")
+    p.add_argument("--slow-kb", type=int, default=64)
+    p.add_argument("--probe-timeout", type=float, default=5.0)
+    # read load
+    p.add_argument("--readers", type=int, default=4, help="concurrent clients per read endpoint (0 = none)")
+    # misc
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--cluster", action="store_true", help="leave CLUSTER_ENABLED as configured")
+    p.add_argument("--keep", action="store_true", help="don't delete the seeded users/monitors")
+    p.add_argument("--out", help="also write the JSON report here")
+    return p.parse_args(argv)
+
+
+def _mix(spec: str) -> list[tuple[str, float]]:
+    from .farm import MODES
+
+    out = []
+    for part in spec.split(","):
+        mode, _, w = part.partition("=")
+        if mode.strip() not in MODES:
+            raise SystemExit(f"unknown mode {mode!r} in --mix (one of {', '.join(MODES)})")
+        out.append((mode.strip(), float(w)))
+    return out
+
+
+def _pct(xs: list[float], scale: float = 1000.0) -> dict:
+    """Nearest-rank percentiles (in ms for second-valued samples)."""
+    if not xs:
+        return {"n": 0}
+    xs = sorted(xs)
+    pick = lambda q: round(xs[min(len(xs) - 1, int(q * len(xs)))] * scale, 2)
+    return {"n": len(xs), "p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(xs[-1] * scale, 2)}
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+_USERS = """
+insert into users (id, email, password_hash)
+select * from unnest(cast(:id as text[]), cast(:email as text[]), cast(:password_hash as text[]))
+"""
+_MONITORS = """
+insert into monitors (id, slug, name, url, interval_sec, expected_status, fresh_connection, probe_mode, user_id)
+select * from unnest(
+    cast(:id as text[]), cast(:slug as text[]), cast(:name as text[]), cast(:url as text[]),
+    cast(:interval_sec as int[]), cast(:expected_status as int[]), cast(:fresh_connection as bool[]),
+    cast(:probe_mode as text[]), cast(:user_id as text[])
+)
+"""
+
+
+async def _seed(a, farm, run: str):
+    from sqlalchemy import text
+    from app.db import async_engine
+    from app.utils import ulid
+
+    rnd = random.Random(a.seed)
+    modes = _mix(a.mix)
+    user_ids = [ulid() for _ in range(a.users)]
+    monitors = {c: [] for c in ("id", "slug", "name", "url", "interval_sec", "expected_status", "fresh_connection", "probe_mode", "user_id")}
+    ngroups = -(-a.monitors // a.share)
+    for g in range(ngroups):
+        mode = rnd.choices([m for m, _ in modes], [w for _, w in modes])[0]
+        url = farm.url(g, mode, a.latency_ms, a.slow_kb)
+        fresh = rnd.random() * 100 < a.fresh_pct
+        for j in range(min(a.share, a.monitors - g * a.share)):
+            n = g * a.share + j
+            monitors["id"].append(ulid())
+            monitors["slug"].append(f"bench-{run}-{n}")
+            monitors["name"].append(f"Bench {n}")
+            monitors["url"].append(url)
+            monitors["interval_sec"].append(a.interval)
+            monitors["expected_status"].append(200)
+            monitors["fresh_connection"].append(fresh)
+            monitors["probe_mode"].append(a.probe_mode)
+            monitors["user_id"].append(user_ids[n % len(user_ids)])
+
+    async with async_engine.begin() as conn:
+        await conn.execute(text(_USERS), {
+            "id": user_ids,
+            "email": [f"bench-{run}-{i}@bench.invalid" for i in range(len(user_ids))],
+            "password_hash": ["!"] * len(user_ids),  # not a valid bcrypt hash: nobody can log in
+        })
+        for i in range(0, len(monitors["id"]), 5000):
+            await conn.execute(text(_MONITORS), {c: v[i:i + 5000] for c, v in monitors.items()})
+    groups = set(zip(monitors["url"], monitors["interval_sec"]))
+    return user_ids, list(zip(monitors["id"], monitors["slug"], monitors["user_id"])), groups
+
+
+async def _cleanup(user_ids: list[str]):
+    from sqlalchemy import text
+    from app.db import async_engine
+
+    async with async_engine.begin() as conn:
+        await conn.execute(text("delete from users where id = any(:ids)"), {"ids": user_ids})
+
+
+async def _reader(client, make_path, samples: list, errors: list, stop: asyncio.Event):
+    while not stop.is_set():
+        path, headers = make_path()
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path, headers=headers)
+            ok = r.status_code < 400
+        except Exception:
+            ok = False
+        dt = time.perf_counter() - t0
+        if ok:
+            samples.append(dt)
+        else:
+            errors.append(dt)
+
+
+def _snapshot(metrics) -> dict:
+    batches, batch_sec = metrics.DB_WRITE.totals()
+    return {
+        "probes": metrics.PROBE_RESULTS.total(),
+        "checks": metrics.CHECK_RESULTS.total(),
+        "outcomes": {k[0]: v for k, v in metrics.PROBE_RESULTS.values().items()},
+        "rows": metrics.DB_WRITE_ROWS.total(),
+        "batches": batches,
+        "batch_sec": batch_sec,
+        "skipped": metrics.SCHEDULER_SKIPPED.total(),
+        "failures": metrics.SCHEDULER_JOB_FAILURES.total(),
+        "delayed": metrics.PROBE_ADMISSION_DELAYED.total(),
+        "adm_skipped": metrics.PROBE_ADMISSION_SKIPPED.total(),
+    }
+
+
+async def run(a) -> dict:
+    import httpx
+    from sqlalchemy import text
+    from app.db import async_engine
+    from app.main import app
+    from app.services import metrics, scheduler
+    from .farm import TargetFarm
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    warmup = a.interval if a.warmup is None else a.warmup
+
+    farm = TargetFarm(hosts=a.hosts, jitter=a.jitter)
+    await farm.start()
+    t_seed = time.perf_counter()
+    user_ids, monitors, groups = await _seed(a, farm, run_id)
+    seed_sec = time.perf_counter() - t_seed
+    bench_ids = [m[0] for m in monitors]
+
+    def summary_req():
+        return f"/v1/monitors/{random.choice(monitors)[0]}/summary?range=24h", {}
+
+    def status_req():
+        return f"/v1/status/{random.choice(monitors)[1]}", {}
+
+    reads = {"monitor_summary": (summary_req, [], []), "public_status": (status_req, [], [])}
+    stop_readers = asyncio.Event()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    readers: list[asyncio.Task] = []
+    try:
+        scheduler.start_scheduler()
+        # the initial load is fire-and-forget; wait until our groups are on the wheel
+        keys = {scheduler.job_key(url, interval) for url, interval in groups}
+        deadline = time.monotonic() + 60
+        while not keys <= scheduler.groups.keys() and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+
+        await asyncio.sleep(warmup)
+
+        for name, (make, samples, errors) in reads.items():
+            for _ in range(a.readers):
+                readers.append(asyncio.create_task(_reader(client, make, samples, errors, stop_readers)))
+        before = _snapshot(metrics)
+        scheduler.scheduler.lags.clear()
+        start_wall = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        await asyncio.sleep(a.duration)
+        elapsed = time.perf_counter() - t0
+        end_wall = datetime.now(timezone.utc)
+        after = _snapshot(metrics)
+        lags = list(scheduler.scheduler.lags)
+        groups_on_wheel = len(scheduler.scheduler)
+
+        stop_readers.set()
+        await asyncio.gather(*readers, return_exceptions=True)
+    finally:
+        stop_readers.set()
+        for t in readers:
+            t.cancel()
+        await client.aclose()
+        await scheduler.stop_scheduler()  # drains the writer, so every measured check is in the DB now
+        await farm.stop()
+
+    try:
+        async with async_engine.connect() as conn:
+            bench_rows = (await conn.execute(
+                text("select count(*) from checks where monitor_id = any(:ids) and ts >= :s and ts < :e"),
+                {"ids": bench_ids, "s": start_wall, "e": end_wall},
+            )).scalar_one()
+    finally:
+        if not a.keep:
+            await _cleanup(user_ids)
+        await async_engine.dispose()
+
+    d = {k: after[k] - before[k] for k in ("probes", "checks", "rows", "batches", "batch_sec", "skipped", "failures", "delayed", "adm_skipped")}
+    return {
+        "meta": {
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "started_at": start_wall.isoformat(),
+            "elapsed_sec": round(elapsed, 3),
+            "seed_sec": round(seed_sec, 3),
+            "args": vars(a),
+        },
+        "probes": {
+            "checks_per_sec": round(d["checks"] / elapsed, 2),
+            "expected_checks_per_sec": round(a.monitors / a.interval, 2),
+            "group_runs_per_sec": round(len(lags) / elapsed, 2),
+            "probes_per_sec": round(d["probes"] / elapsed, 2),
+            "outcomes": {k: after["outcomes"].get(k, 0) - before["outcomes"].get(k, 0) for k in after["outcomes"]},
+            "farm_requests": farm.requests,
+        },
+        "scheduler": {
+            "groups": groups_on_wheel,
+            "admission_delayed": d["delayed"],
+            "admission_skipped": d["adm_skipped"],
+            "drift_ms": _pct(lags),
+            "skipped_runs": d["skipped"],
+            "job_failures": d["failures"],
+        },
+        "db": {
+            "rows_per_sec": round(d["rows"] / elapsed, 2),
+            "bench_rows_per_sec": round(bench_rows / elapsed, 2),
+            "batches": int(d["batches"]),
+            "batch_avg_ms": round(d["batch_sec"] / d["batches"] * 1000, 2) if d["batches"] else None,
+        },
+        "api": {
+            name: {
+                "rps": round(len(samples) / elapsed, 2),
+                "errors": len(errors),
+                "latency_ms": _pct(samples),
+            }
+            for name, (_, samples, errors) in reads.items()
+        },
+    }
+
+
+def main(argv=None):
+    a = _args(argv)
+    # must be in the environment before app.config is imported
+    os.environ["PROBE_TIMEOUT_SEC"] = str(a.probe_timeout)
+    os.environ.setdefault("SCHEDULER_LAG_SAMPLES", "10000000")
+    if not a.cluster:
+        os.environ["CLUSTER_ENABLED"] = "false"
+    random.seed(a.seed)
+
+    report = asyncio.run(run(a))
+    out = json.dumps(report, indent=2, default=str)
+    if a.out:
+        with open(a.out, "w") as f:
+            f.write(out + "\n")
+    print(out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
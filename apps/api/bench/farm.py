@@ -0,0 +1,105 @@
+# apps/api/bench/farm.py
+"""
+Fake probe targets for the benchmark: a few plain asyncio HTTP/1.1 servers
+on loopback, one per address (127.0.0.2, 127.0.0.3, ... where the OS
+allows, else 127.0.0.1 with one port each), so probes spread over several
+"hosts" the way they would in production (probes are rate-limited per host).
+
+Each request's behaviour comes from its query string, so a monitor's URL
+fully describes how its target answers:
+
+    /t/<n>?mode=ok&ms=20          200 after ~20ms
+    /t/<n>?mode=error&ms=20       500 after ~20ms
+    /t/<n>?mode=timeout           never answers; holds the connection until the client hangs up
+    /t/<n>?mode=slow&ms=20&kb=64  200, then the body trickles out over ~ms per KB
+    /t/<n>?mode=reset             connection closed without a response
+"""
+import asyncio, random
+from typing import List, Set
+from urllib.parse import parse_qs, urlsplit
+
+MODES = ("ok", "error", "timeout", "slow", "reset")
+
+
+class TargetFarm:
+    def __init__(self, hosts: int = 4, jitter: float = 0.2):
+        self.nhosts = hosts
+        self.jitter = jitter  # +/- fraction applied to every delay
+        self.addrs: List[tuple[str, int]] = []
+        self.requests = 0
+        self._servers: List[asyncio.base_events.Server] = []
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def start(self):
+        for i in range(self.nhosts):
+            try:
+                srv = await asyncio.start_server(self._handle, f"127.0.0.{i + 2}", 0, backlog=4096)
+            except OSError:  # only 127.0.0.1 is routable here (e.g. macOS)
+                srv = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+            self._servers.append(srv)
+            self.addrs.append(srv.sockets[0].getsockname()[:2])
+
+    async def stop(self):
+        for srv in self._servers:
+            srv.close()
+        # 3.12+ wait_closed() also waits for open connections; end ours first
+        for t in self._handlers:
+            t.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await asyncio.gather(*(srv.wait_closed() for srv in self._servers), return_exceptions=True)
+        self._servers.clear()
+
+    def url(self, n: int, mode: str, ms: int, kb: int = 0) -> str:
+        host, port = self.addrs[n % len(self.addrs)]
+        q = f"mode={mode}&ms={ms}" + (f"&kb={kb}" if mode == "slow" else "")
+        return f"http://{host}:{port}/t/{n}?{q}"
+
+    def _delay(self, ms: float) -> float:
+        return max(0.0, ms * (1 + random.uniform(-self.jitter, self.jitter)) / 1000)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target = line.split()[:2]
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                q = {k: v[0] for k, v in parse_qs(urlsplit(target.decode()).query).items()}
+                mode = q.get("mode", "ok")
+                ms = float(q.get("ms", 0))
+
+                if mode == "timeout":
+                    while await reader.read(65536):  # until the prober gives up and hangs up
+                        pass
+                    break
+                if mode == "reset":
+                    break
+                await asyncio.sleep(self._delay(ms))
+
+                head = method == b"HEAD"
+                if mode == "slow":
+                    kb = int(q.get("kb", 64))
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\nConnection: keep-alive\r\n\r\n" % (kb * 1024))
+                    if not head:
+                        for _ in range(kb):
+                            await writer.drain()
+                            await asyncio.sleep(self._delay(ms))
+                            writer.write(b"x" * 1024)
+                else:
+                    code = 500 if mode == "error" else 200
+                    body = b'{"ok":true}' if code == 200 else b'{"ok":false}'
+                    writer.write(
+                        b"HTTP/1.1 %d X\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: keep-alive\r\n\r\n"
+                        % (code, len(body)) + (b"" if head else body)
+                    )
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError, ValueError, IndexError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
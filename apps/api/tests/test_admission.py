@@ -0,0 +1,39 @@
+import asyncio, os, unittest
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services import admission  # noqa: E402
+
+
+class AdmissionRaceTest(unittest.IsolatedAsyncioTestCase):
+    async def test_admitted_at_deadline_keeps_slot(self):
+        c = admission.AdmissionController(max_in_flight=1, rate=1000, burst=1000)
+        self.assertTrue(await c.acquire("http://a.example/", 1))
+
+        async def wait_for(fut, timeout):
+            # the slot frees up and the waiter is admitted in the same loop
+            # iteration the deadline fires: 3.12+ wait_for raises anyway
+            c.release()
+            self.assertTrue(fut.done())
+            raise asyncio.TimeoutError
+
+        with mock.patch.object(admission.asyncio, "wait_for", wait_for):
+            admitted = await c.acquire("http://b.example/", 0.01)
+
+        self.assertTrue(admitted)
+        self.assertEqual(c.in_flight, 1)
+        c.release()
+        self.assertEqual(c.in_flight, 0)
+        self.assertTrue(await c.acquire("http://c.example/", 0.01))
+
+    async def test_timeout_without_slot_skips(self):
+        c = admission.AdmissionController(max_in_flight=1, rate=1000, burst=1000)
+        self.assertTrue(await c.acquire("http://a.example/", 1))
+        self.assertFalse(await c.acquire("http://b.example/", 0.01))
+        self.assertEqual(c.in_flight, 1)
+        self.assertEqual(c.queued, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
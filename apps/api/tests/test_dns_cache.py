@@ -0,0 +1,98 @@
+import asyncio, os, time, unittest
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+import httpcore  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.dns_cache import DNSCache  # noqa: E402
+
+
+def _resolver(ttl: int):
+    answer = mock.MagicMock()
+    answer.rrset.ttl = ttl
+    answer.__iter__.return_value = [SimpleNamespace(address="192.0.2.1")]
+    return SimpleNamespace(resolve=mock.AsyncMock(return_value=answer))
+
+
+class DNSCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_ttl_clamped(self):
+        c = DNSCache()
+        for ttl, want in ((1, settings.DNS_CACHE_MIN_TTL_SEC), (10**6, settings.DNS_CACHE_MAX_TTL_SEC), (30, 30)):
+            with mock.patch.object(c, "_get_resolver", return_value=_resolver(ttl)):
+                self.assertEqual(await c._query("example.com"), (["192.0.2.1"], want))
+
+    async def test_hit_until_expiry(self):
+        c = DNSCache()
+        resolve = mock.AsyncMock(return_value=(["192.0.2.1"], 30))
+        with mock.patch.object(c, "_resolve", resolve):
+            self.assertEqual(await c.resolve("example.com"), ["192.0.2.1"])
+            self.assertEqual(await c.resolve("example.com"), ["192.0.2.1"])
+            self.assertEqual(resolve.await_count, 1)
+            addrs, _ = c._entries["example.com"]
+            c._entries["example.com"] = (addrs, time.monotonic() - 1)
+            await c.resolve("example.com")
+            self.assertEqual(resolve.await_count, 2)
+
+    async def test_single_flight(self):
+        c = DNSCache()
+        gate = asyncio.Event()
+
+        async def slow(host):
+            await gate.wait()
+            return ["192.0.2.1"], 30
+
+        resolve = mock.AsyncMock(side_effect=slow)
+        with mock.patch.object(c, "_resolve", resolve):
+            waiters = [asyncio.create_task(c.resolve("example.com")) for _ in range(5)]
+            await asyncio.sleep(0)
+            gate.set()
+            self.assertEqual(await asyncio.gather(*waiters), [["192.0.2.1"]] * 5)
+        self.assertEqual(resolve.await_count, 1)
+
+    async def test_waiter_timeout_keeps_shared_lookup(self):
+        c = DNSCache()
+        gate = asyncio.Event()
+
+        async def slow(host):
+            await gate.wait()
+            return ["192.0.2.1"], 30
+
+        with mock.patch.object(c, "_resolve", mock.AsyncMock(side_effect=slow)):
+            patient = asyncio.create_task(c.resolve("example.com"))
+            with self.assertRaises(httpcore.ConnectTimeout):
+                await c.resolve("example.com", timeout=0.01)
+            gate.set()
+            self.assertEqual(await patient, ["192.0.2.1"])
+
+    async def test_negative_cached(self):
+        c = DNSCache()
+        resolve = mock.AsyncMock(return_value=(None, 0))
+        with mock.patch.object(c, "_resolve", resolve):
+            before = time.monotonic()
+            for _ in range(3):
+                with self.assertRaises(httpcore.ConnectError):
+                    await c.resolve("nx.example")
+        self.assertEqual(resolve.await_count, 1)
+        addrs, expires = c._entries["nx.example"]
+        self.assertIsNone(addrs)
+        self.assertAlmostEqual(expires - before, settings.DNS_CACHE_NEGATIVE_TTL_SEC, delta=1)
+
+    async def test_lru_bound(self):
+        c = DNSCache(max_entries=2)
+        with mock.patch.object(c, "_resolve", mock.AsyncMock(return_value=(["192.0.2.1"], 30))):
+            for host in ("a", "b", "a", "c"):
+                await c.resolve(host)
+        self.assertEqual(list(c._entries), ["a", "c"])
+
+    async def test_uncached_lookup_leaves_cache_alone(self):
+        c = DNSCache()
+        with mock.patch.object(c, "_resolve", mock.AsyncMock(return_value=(["192.0.2.1"], 30))):
+            self.assertEqual(await c.resolve_uncached("example.com"), ["192.0.2.1"])
+        self.assertEqual(len(c), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import os, unittest
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services import history  # noqa: E402
+
+
+class FoldTest(unittest.TestCase):
+    def test_outage_runs_to_first_ok_check(self):
+        spans, last_sec, last_ok = history._fold([], None, None, [(10, True), (20, False), (30, False), (40, True), (50, False)])
+        self.assertEqual(spans, [20, 20, 50, 0])
+        self.assertEqual((last_sec, last_ok), (50, False))
+
+    def test_open_outage_is_extended_by_next_batch(self):
+        state = history._fold([], None, None, [(10, True), (20, False), (30, False), (40, True), (50, False)])
+        # 45 arrives late: counted elsewhere, but it doesn't touch the spans
+        spans, last_sec, last_ok = history._fold(*state, [(45, False), (60, False), (70, True), (80, True)])
+        self.assertEqual(spans, [20, 20, 50, 20])
+        self.assertEqual((last_sec, last_ok), (80, True))
+
+    def test_outage_carried_over_midnight_starts_at_zero(self):
+        spans, last_sec, last_ok = history._fold(*history._CARRIED, [(30, False), (90, True), (120, True)])
+        self.assertEqual(spans, [0, 90])
+        self.assertEqual((last_sec, last_ok), (120, True))
+
+    def test_carried_outage_still_open(self):
+        self.assertEqual(history._fold(*history._CARRIED, [(30, False)]), ([0, 30], 30, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio, os, unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from psycopg.errors import ForeignKeyViolation  # noqa: E402
+
+from app.services import ingest  # noqa: E402
+
+
+def _row(mid: str) -> ingest.CheckRow:
+    return ingest.CheckRow(mid, 200, True, 5, datetime.now(timezone.utc))
+
+
+class CheckWriterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_orphan_lookup_failure_is_retried(self):
+        writes, lookups = [], []
+
+        async def write_batch(batch):
+            writes.append(list(batch))
+            if len(writes) == 1:
+                raise ForeignKeyViolation()
+
+        async def drop_orphans(batch):
+            lookups.append(batch)
+            if len(lookups) == 1:
+                raise ConnectionError("db went away")
+            return [r for r in batch if r.monitor_id != "gone"]
+
+        w = ingest.CheckWriter(batch_size=10, flush_interval=0.01)
+        with mock.patch.object(ingest, "_write_batch", write_batch), \
+             mock.patch.object(ingest, "_drop_orphans", drop_orphans), \
+             mock.patch.object(ingest.asyncio, "sleep", mock.AsyncMock()):
+            await w._flush([_row("a"), _row("gone")])
+
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual([r.monitor_id for r in writes[-1]], ["a"])
+
+    async def test_writer_survives_a_failing_batch(self):
+        written = []
+
+        async def flush(batch):
+            if batch[0].monitor_id == "boom":
+                raise RuntimeError("bug")
+            written.extend(batch)
+
+        w = ingest.CheckWriter(batch_size=1, flush_interval=0.01)
+        with mock.patch.object(w, "_flush", flush):
+            w.start()
+            await w.submit([_row("boom")])
+            await w.submit([_row("ok")])
+            await asyncio.wait_for(w.stop(), 1)
+        self.assertEqual([r.monitor_id for r in written], ["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio, os, unittest
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services import dns_cache  # noqa: E402
+from app.services.probe_client import ProbeClient  # noqa: E402
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    while await reader.readline():
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n2\r\nok\r\n0\r\n\r\n")
+        await writer.drain()
+    writer.close()
+
+
+class ProbePhasesTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+        self.url = f"http://localhost:{self.server.sockets[0].getsockname()[1]}/"
+        self.client = ProbeClient(timeout=5)
+        dns_cache.cache.clear()
+        # no DNS servers in tests: names go through getaddrinfo ("localhost")
+        p = mock.patch.object(dns_cache.cache, "_query", mock.AsyncMock(return_value=(None, 0)))
+        p.start()
+        self.addCleanup(p.stop)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self.server.close()
+
+    async def test_cold_probe_reports_dns(self):
+        for _ in range(2):
+            res = await self.client.probe(self.url, fresh=True)
+            self.assertEqual(res.status_code, 200)
+            self.assertIs(res.reused, False)
+            self.assertIsNotNone(res.dns_ms)
+            self.assertIsNotNone(res.connect_ms)
+        self.assertEqual(len(dns_cache.cache), 0)  # cold lookups bypass the cache
+
+    async def test_warm_probe_reuses_chunked_connection(self):
+        first = await self.client.probe(self.url)
+        second = await self.client.probe(self.url)
+        self.assertIs(first.reused, False)
+        self.assertIsNotNone(first.dns_ms)
+        self.assertIs(second.reused, True)
+        self.assertIsNone(second.dns_ms)
+
+    async def test_idle_hosts_are_forgotten(self):
+        sem = self.client._host_slot(self.url)
+        self.assertIs(self.client._host_slot(self.url + "x"), sem)  # same host, same limit
+        del sem
+        await self.client.probe(self.url)
+        self.assertEqual(len(self.client._hosts), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os, unittest
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services.rollups import _split  # noqa: E402
+
+
+def _t(h: int, m: int, s: int = 0) -> datetime:
+    return datetime(2025, 9, 1, h, m, s, tzinfo=timezone.utc)
+
+
+class SplitTest(unittest.TestCase):
+    def test_under_a_minute_is_raw_only(self):
+        end = _t(10, 0, 50)
+        self.assertEqual(_split(_t(10, 0, 30), end), (end, end, end, end))
+
+    def test_under_an_hour_has_no_hour_span(self):
+        self.assertEqual(_split(_t(10, 0, 30), _t(10, 20, 10)), (_t(10, 1), _t(10, 20), _t(10, 20), _t(10, 20)))
+
+    def test_hours_with_minute_edges(self):
+        self.assertEqual(_split(_t(10, 0, 30), _t(13, 20, 10)), (_t(10, 1), _t(13, 20), _t(11, 0), _t(13, 0)))
+
+    def test_aligned_window(self):
+        self.assertEqual(_split(_t(10, 0), _t(12, 0)), (_t(10, 0), _t(12, 0), _t(10, 0), _t(12, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os, random, unittest
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services.sketch import ALPHA, LatencySketch  # noqa: E402
+
+
+class LatencySketchTest(unittest.TestCase):
+    def test_quantiles_within_relative_error(self):
+        rnd = random.Random(7)
+        xs = sorted(rnd.lognormvariate(4, 1.2) for _ in range(5000))
+        s = LatencySketch()
+        s.update(xs)
+        for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+            exact = xs[int(q * (len(xs) - 1))]
+            self.assertLessEqual(abs(s.quantile(q) - exact) / exact, ALPHA, q)
+
+    def test_roundtrip(self):
+        s = LatencySketch()
+        s.update([0, 0, 0.4, 3, 250, 250, 9000])
+        t = LatencySketch.from_bytes(s.to_bytes())
+        self.assertEqual((t.bins, t.zero, t.count), (s.bins, 2, 7))
+        self.assertEqual(t.quantile(0.5), s.quantile(0.5))
+        self.assertEqual(t.quantile(0.0), 0.0)
+
+    def test_empty(self):
+        self.assertIsNone(LatencySketch.from_bytes(None).quantile(0.5))
+        self.assertEqual(LatencySketch.from_bytes(LatencySketch().to_bytes()).count, 0)
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            LatencySketch.from_bytes(b"\x09\x00\x00")
+
+    def test_merge_equals_union(self):
+        a, b, both = LatencySketch(), LatencySketch(), LatencySketch()
+        a.update([1, 5, 50])
+        b.update([0, 5, 700])
+        both.update([1, 5, 50, 0, 5, 700])
+        a.merge(b)
+        self.assertEqual(a.to_bytes(), both.to_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
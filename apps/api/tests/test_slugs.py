@@ -0,0 +1,29 @@
+import os, unittest
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.utils import allocate_slugs  # noqa: E402
+
+
+class AllocateSlugsTest(unittest.TestCase):
+    def test_collisions_within_batch(self):
+        self.assertEqual(allocate_slugs(["api", "api", "web", "api"], set()), ["api", "api-2", "web", "api-3"])
+
+    def test_continues_after_taken_suffixes(self):
+        self.assertEqual(allocate_slugs(["api", "api"], {"api", "api-2", "api-7"}), ["api-8", "api-9"])
+
+    def test_free_base_with_taken_suffix(self):
+        self.assertEqual(allocate_slugs(["api", "api"], {"api-4"}), ["api", "api-5"])
+
+    def test_ignores_other_bases_suffixes(self):
+        # "api-v2-3" is a suffix of "api-v2", not of "api"
+        self.assertEqual(allocate_slugs(["api", "api"], {"api", "api-v2-3"}), ["api-2", "api-3"])
+
+    def test_suffix_that_is_another_base_in_batch(self):
+        for bases in (["foo", "foo", "foo-2"], ["foo-2", "foo", "foo"]):
+            slugs = allocate_slugs(bases, set())
+            self.assertEqual(len(set(slugs)), len(slugs), slugs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio, os, unittest
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/uptime")
+
+from app.services.timing_wheel import TimingWheel, next_due  # noqa: E402
+
+
+class TimingWheelTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.runs = []
+        self.wheel = TimingWheel(tick=1.0, slots=8)
+
+    async def job(self, key):
+        self.runs.append(key)
+
+    async def advance(self, now: float):
+        self.wheel._advance(now)
+        await asyncio.sleep(0)  # let the launched jobs run
+
+    async def test_add_remove(self):
+        self.assertTrue(self.wheel.add("a", 10, self.job, "a", first_due=100.0))
+        self.assertFalse(self.wheel.add("a", 10, self.job, "a", first_due=100.0))
+        self.assertIn("a", self.wheel)
+        self.assertEqual(len(self.wheel), 1)
+        self.assertTrue(self.wheel.remove("a"))
+        self.assertFalse(self.wheel.remove("a"))
+        await self.advance(100.5)
+        self.assertEqual(self.runs, [])
+
+    async def test_fires_once_per_interval(self):
+        # the interval is longer than a revolution (8 ticks): the entry waits in its slot
+        self.wheel.add("a", 10, self.job, "a", first_due=100.0)
+        await self.advance(99.5)
+        self.assertEqual(self.runs, [])
+        await self.advance(100.5)
+        self.assertEqual(self.runs, ["a"])
+        for now in (102.0, 105.0, 109.0):
+            await self.advance(now)
+        self.assertEqual(self.runs, ["a"])
+        await self.advance(110.2)
+        self.assertEqual(self.runs, ["a", "a"])
+        self.assertEqual(len(self.wheel.lags), 2)
+
+    async def test_missed_periods_are_skipped(self):
+        self.wheel.add("a", 10, self.job, "a", first_due=100.0)
+        await self.advance(100.0)
+        await self.advance(145.0)  # stalled through 110..140
+        self.assertEqual(self.runs, ["a", "a"])
+        self.assertAlmostEqual(self.wheel.lags[-1], 35.0)
+        due = self.wheel._entries["a"].due
+        self.assertEqual(due, next_due("a", 10, 145.0))
+        self.assertTrue(145.0 < due <= 155.0)
+        await self.advance(due - 2)
+        self.assertEqual(len(self.runs), 2)
+        await self.advance(due)
+        self.assertEqual(len(self.runs), 3)
+
+    async def test_run_now(self):
+        self.wheel.add("a", 10, self.job, "a", first_due=100.0)
+        self.assertTrue(self.wheel.run_now("a"))
+        self.assertFalse(self.wheel.run_now("b"))
+        await asyncio.sleep(0)
+        self.assertEqual(self.runs, ["a"])
+
+    async def test_still_running_is_skipped(self):
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+
+        self.wheel.add("a", 1, slow, first_due=100.0)
+        await self.advance(100.0)
+        await self.advance(101.0)
+        self.assertEqual(self.wheel.skipped, 1)
+        gate.set()
+        await asyncio.sleep(0)
+
+
+class NextDueTest(unittest.TestCase):
+    def test_stays_on_phase_grid(self):
+        first = next_due("k", 60, 1000.0)
+        self.assertTrue(1000.0 < first <= 1060.0)
+        self.assertAlmostEqual(next_due("k", 60, first), first + 60)
+        self.assertAlmostEqual(next_due("k", 60, first + 59.9), first + 60)
+
+
+if __name__ == "__main__":
+    unittest.main()